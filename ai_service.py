@@ -1,92 +1,150 @@
 # ai_service.py
 import asyncio
+import hashlib
+from collections import Counter
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 import os
+from cachetools import TTLCache
 from google import genai
 from model import User, Habit, HabitCheckIn, AIRecommendation
+from gamification_service import GamificationService
+
+# Analytics and AI responses are stable for a few minutes, so repeated
+# requests within this window skip recomputation and the Gemini round-trip
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_ENTRIES = 10_000
+
+_analytics_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+_response_cache = TTLCache(maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+
+# One Gemini client per process, shared by every service instance so its
+# connection pool is reused; concurrent LLM calls are capped by a semaphore
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+_gemini_client: Optional[genai.Client] = None
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+def _get_gemini_client(api_key: Optional[str]) -> genai.Client:
+    """Create the Gemini client on first use and reuse it afterwards"""
+    global _gemini_client
+    if _gemini_client is None:
+        _gemini_client = genai.Client(api_key=api_key)
+    return _gemini_client
+
+# Prompt templates are built once at import and filled with str.format_map
+_BASE_CONTEXT_TEMPLATE = """
+User Habit Analytics:
+- Total active habits: {total_habits}
+- Average streak: {average_streak:.1f} days
+- Average completion rate: {average_completion_rate:.1f}%
+- Best streak: {best_streak} days
+- Habit categories: {categories}
+- Number of struggling habits: {struggling_count}
+- Number of strong habits: {strong_count}
+"""
+
+_PROMPT_TEMPLATES = {
+    "habit_suggestion": _BASE_CONTEXT_TEMPLATE + """
+Based on this user's habit tracking data, suggest 1-2 new habits they could add to improve their life.
+Consider their current categories and completion rates. Provide specific, actionable habit suggestions.
+Keep the response concise (max 200 words) and motivational.
+""",
+    "motivation": _BASE_CONTEXT_TEMPLATE + """
+Create a motivational message for this user based on their habit tracking performance.
+Acknowledge their progress and encourage them to keep going. If they're struggling,
+provide gentle encouragement and practical tips. Keep it personal and under 150 words.
+""",
+    "improvement": _BASE_CONTEXT_TEMPLATE + """
+Analyze the user's habit data and provide 1-2 specific suggestions for improving their
+habit tracking success. Focus on practical strategies they can implement immediately.
+Keep the response actionable and under 200 words.
+""",
+}
 
 class AIRecommendationService:
     def __init__(self):
         self.gemini_api_key = os.getenv("GEMINI_API_KEY")
         self.grok_api_key = os.getenv("GROK_API_KEY")
+    
+    def invalidate_user_analytics(self, user_id: int):
+        """Drop cached analytics after the user's habits or check-ins change"""
+        _analytics_cache.pop(user_id, None)
         
     async def get_user_analytics(self, user_id: int, db: AsyncSession) -> Dict[str, Any]:
         """Get comprehensive user analytics for AI recommendations"""
+        cached = _analytics_cache.get(user_id)
+        if cached is not None:
+            return cached
+        
+        # Only the columns analytics reads, as plain rows rather than ORM objects;
+        # both queries run on the caller's session, which a request already holds
         result = await db.execute(
-            select(Habit)
+            select(Habit.id, Habit.category, Habit.start_date)
             .where(and_(Habit.user_id == user_id, Habit.is_active == True))
         )
-        habits = result.scalars().all()
+        habits = result.all()
+        
+        # Aggregate the last 30 days of check-ins in SQL
+        now = datetime.utcnow()
+        thirty_days_ago = now - timedelta(days=30)
+        checkin_stats = await GamificationService.get_checkin_stats(user_id, db, since=thirty_days_ago)
         
         total_habits = len(habits)
-        active_streaks = []
-        completion_rates = []
-        categories = {}
-        
-        for habit in habits:
-            thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-            checkins_result = await db.execute(
-                select(HabitCheckIn)
-                .where(and_(
-                    HabitCheckIn.habit_id == habit.id,
-                    HabitCheckIn.check_in_date >= thirty_days_ago
-                ))
-            )
-            recent_checkins = checkins_result.scalars().all()
-            
-            streak = self._calculate_current_streak(recent_checkins)
-            active_streaks.append(streak)
-            
-            days_since_creation = (datetime.utcnow() - habit.start_date).days + 1
-            completion_rate = len(recent_checkins) / min(30, days_since_creation) * 100
-            completion_rates.append(completion_rate)
+        streak_total = 0
+        best_streak = 0
+        completion_rate_total = 0.0
+        struggling_habits = []
+        strong_habits = []
+        
+        # Accumulate totals and classify each habit in a single pass
+        for i, (habit_id, _, start_date) in enumerate(habits):
+            recent_count, streak = checkin_stats.get(habit_id, (0, 0))
+            streak_total += streak
+            best_streak = max(best_streak, streak)
             
-            category = habit.category or "general"
-            categories[category] = categories.get(category, 0) + 1
-        
-        return {
+            days_since_creation = (now - start_date).days + 1
+            completion_rate = recent_count / min(30, days_since_creation) * 100
+            completion_rate_total += completion_rate
+            if completion_rate < 50:
+                struggling_habits.append(i)
+            elif completion_rate > 80:
+                strong_habits.append(i)
+        
+        # Plain dict so the prompt renders it as before, not as Counter(...)
+        categories = dict(Counter(category or "general" for _, category, _ in habits))
+        
+        analytics = {
             "total_habits": total_habits,
-            "average_streak": sum(active_streaks) / len(active_streaks) if active_streaks else 0,
-            "average_completion_rate": sum(completion_rates) / len(completion_rates) if completion_rates else 0,
-            "best_streak": max(active_streaks) if active_streaks else 0,
+            "average_streak": streak_total / total_habits if total_habits else 0,
+            "average_completion_rate": completion_rate_total / total_habits if total_habits else 0,
+            "best_streak": best_streak,
             "categories": categories,
-            "struggling_habits": [i for i, rate in enumerate(completion_rates) if rate < 50],
-            "strong_habits": [i for i, rate in enumerate(completion_rates) if rate > 80]
+            "struggling_habits": struggling_habits,
+            "strong_habits": strong_habits
         }
-    
-    def _calculate_current_streak(self, checkins: list[HabitCheckIn]) -> int:
-        """Calculate current streak for a habit"""
-        if not checkins:
-            return 0
-        
-        sorted_checkins = sorted(checkins, key=lambda x: x.check_in_date, reverse=True)
-        streak = 0
-        current_date = datetime.utcnow().date()
-        
-        for checkin in sorted_checkins:
-            checkin_date = checkin.check_in_date.date()
-            expected_date = current_date - timedelta(days=streak)
-            
-            if checkin_date == expected_date:
-                streak += 1
-            else:
-                break
-        
-        return streak
+        _analytics_cache[user_id] = analytics
+        return analytics
     
     async def get_gemini_recommendation(self, prompt: str) -> Optional[str]:
         """Get recommendation from Gemini AI using new SDK"""
+        cache_key = hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).hexdigest()
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            client = genai.Client(api_key=self.gemini_api_key)
+            client = _get_gemini_client(self.gemini_api_key)
             
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=prompt
-            )
+            async with _gemini_semaphore:
+                response = await client.aio.models.generate_content(
+                    model="gemini-2.0-flash-exp",
+                    contents=prompt
+                )
             
+            if response.text:
+                _response_cache[cache_key] = response.text
             return response.text
         except Exception as e:
             print(f"Gemini API error: {e}")
@@ -94,45 +152,16 @@ class AIRecommendationService:
     
     def _create_recommendation_prompt(self, user_analytics: Dict[str, Any], recommendation_type: str) -> str:
         """Create a prompt for AI recommendation based on user analytics"""
-        base_context = f"""
-        User Habit Analytics:
-        - Total active habits: {user_analytics['total_habits']}
-        - Average streak: {user_analytics['average_streak']:.1f} days
-        - Average completion rate: {user_analytics['average_completion_rate']:.1f}%
-        - Best streak: {user_analytics['best_streak']} days
-        - Habit categories: {user_analytics['categories']}
-        - Number of struggling habits: {len(user_analytics['struggling_habits'])}
-        - Number of strong habits: {len(user_analytics['strong_habits'])}
-        """
-        
-        if recommendation_type == "habit_suggestion":
-            return f"""
-            {base_context}
-            
-            Based on this user's habit tracking data, suggest 1-2 new habits they could add to improve their life. 
-            Consider their current categories and completion rates. Provide specific, actionable habit suggestions.
-            Keep the response concise (max 200 words) and motivational.
-            """
-        
-        elif recommendation_type == "motivation":
-            return f"""
-            {base_context}
-            
-            Create a motivational message for this user based on their habit tracking performance. 
-            Acknowledge their progress and encourage them to keep going. If they're struggling, 
-            provide gentle encouragement and practical tips. Keep it personal and under 150 words.
-            """
-        
-        elif recommendation_type == "improvement":
-            return f"""
-            {base_context}
-            
-            Analyze the user's habit data and provide 1-2 specific suggestions for improving their 
-            habit tracking success. Focus on practical strategies they can implement immediately.
-            Keep the response actionable and under 200 words.
-            """
-        
-        return base_context
+        template = _PROMPT_TEMPLATES.get(recommendation_type, _BASE_CONTEXT_TEMPLATE)
+        return template.format_map({
+            "total_habits": user_analytics['total_habits'],
+            "average_streak": user_analytics['average_streak'],
+            "average_completion_rate": user_analytics['average_completion_rate'],
+            "best_streak": user_analytics['best_streak'],
+            "categories": user_analytics['categories'],
+            "struggling_count": len(user_analytics['struggling_habits']),
+            "strong_count": len(user_analytics['strong_habits'])
+        })
     
     def _get_fallback_recommendation(self, analytics: Dict[str, Any], rec_type: str) -> str:
         """Provide fallback recommendations when AI APIs are unavailable"""
@@ -1,6 +1,8 @@
+import asyncio
 import os
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 from dotenv import load_dotenv
 from model import Base
@@ -12,9 +14,11 @@ config = context.config
 # Get DATABASE_URL from environment
 database_url = os.getenv("DATABASE_URL")
 
-# Render provides postgres:// but we need postgresql+psycopg2://
+# Render provides postgres:// but migrations run on the same asyncpg driver as the app
 if database_url and database_url.startswith("postgres://"):
-    database_url = database_url.replace("postgres://", "postgresql+psycopg2://", 1)
+    database_url = database_url.replace("postgres://", "postgresql+asyncpg://", 1)
+elif database_url and database_url.startswith("postgresql://"):
+    database_url = database_url.replace("postgresql://", "postgresql+asyncpg://", 1)
 
 # Override sqlalchemy.url with environment variable
 if database_url:
@@ -36,16 +40,33 @@ def run_migrations_offline() -> None:
     with context.begin_transaction():
         context.run_migrations()
 
-def run_migrations_online() -> None:
-    connectable = engine_from_config(
+def include_object(obj, name, type_, reflected, compare_to) -> bool:
+    """Leave Postgres-only index types (e.g. GIN) out of autogenerate on other backends"""
+    if type_ == "index" and obj.dialect_options["postgresql"]["using"]:
+        return context.get_context().dialect.name == "postgresql"
+    return True
+
+def do_run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+async def run_async_migrations() -> None:
+    connectable = async_engine_from_config(
         config.get_section(config.config_ini_section),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
-    with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
-        with context.begin_transaction():
-            context.run_migrations()
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+def run_migrations_online() -> None:
+    asyncio.run(run_async_migrations())
 
 if context.is_offline_mode():
     run_migrations_offline()
@@ -0,0 +1,34 @@
+"""add habit and check-in query indexes
+
+Revision ID: 3c9a4e1f7b2d
+Revises: ef1595792016
+Create Date: 2026-10-15 09:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a4e1f7b2d'
+down_revision: Union[str, Sequence[str], None] = 'ef1595792016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_hci_habit_date', 'habit_check_ins', ['habit_id', sa.text('check_in_date DESC')], unique=False)
+    op.create_index(
+        'ix_habit_user_active', 'habits', ['user_id'], unique=False,
+        postgresql_where=sa.text('is_active'),
+        sqlite_where=sa.text('is_active = 1')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habit_user_active', table_name='habits')
+    op.drop_index('ix_hci_habit_date', table_name='habit_check_ins')
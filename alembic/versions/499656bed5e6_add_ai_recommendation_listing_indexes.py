@@ -0,0 +1,43 @@
+"""add ai_recommendations user/created_at listing indexes
+
+Revision ID: 499656bed5e6
+Revises: e6f0a3c8d514
+Create Date: 2026-10-15 17:12:08.336140
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '499656bed5e6'
+down_revision: Union[str, Sequence[str], None] = 'e6f0a3c8d514'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction block on PostgreSQL
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_ai_recs_user_created', 'ai_recommendations',
+            ['user_id', sa.text('created_at DESC')],
+            unique=False, postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_ai_recs_user_unread', 'ai_recommendations',
+            ['user_id', sa.text('created_at DESC')],
+            unique=False, postgresql_concurrently=True,
+            postgresql_where=sa.text('NOT is_read'),
+            sqlite_where=sa.text('is_read = 0')
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_ai_recs_user_unread', table_name='ai_recommendations', postgresql_concurrently=True)
+        op.drop_index('ix_ai_recs_user_created', table_name='ai_recommendations', postgresql_concurrently=True)
@@ -0,0 +1,68 @@
+"""add server-side utc timestamp defaults
+
+Revision ID: 5e8b2c71a0f4
+Revises: d4a7f3e9c120
+Create Date: 2026-10-15 12:58:37.904126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8b2c71a0f4'
+down_revision: Union[str, Sequence[str], None] = 'd4a7f3e9c120'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = {
+    'admin_invites': ['created_at'],
+    'users': ['created_at', 'updated_at'],
+    'habits': ['start_date', 'created_at', 'updated_at'],
+    'habit_check_ins': ['check_in_date', 'created_at'],
+    'user_badges': ['earned_at'],
+    'ai_recommendations': ['created_at'],
+}
+
+
+def _utcnow() -> sa.TextClause:
+    """Dialect-specific SQL for the current UTC time, matching model.utcnow"""
+    if op.get_bind().dialect.name == 'postgresql':
+        return sa.text("timezone('utc', now())")
+    return sa.text('CURRENT_TIMESTAMP')
+
+
+def _set_server_default(table: str, columns: list, default) -> None:
+    """Alter the server default of `columns`, keeping the table's indexes intact"""
+    bind = op.get_bind()
+    # SQLite rebuilds the table in batch mode, and reflection loses expression
+    # indexes and DESC ordering, so replay the original index DDL afterwards
+    saved_indexes = []
+    if bind.dialect.name == 'sqlite':
+        saved_indexes = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+            {'table': table}
+        ).all()
+
+    with op.batch_alter_table(table) as batch_op:
+        for column in columns:
+            batch_op.alter_column(column, existing_type=sa.DateTime(), existing_nullable=False, server_default=default)
+
+    for name, sql in saved_indexes:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    default = _utcnow()
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        _set_server_default(table, columns, default)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, columns in TIMESTAMP_COLUMNS.items():
+        _set_server_default(table, columns, None)
@@ -0,0 +1,60 @@
+"""use bigint identity primary keys
+
+Revision ID: 7b1f4e8a2c65
+Revises: a93c5d2e6b17
+Create Date: 2026-10-15 14:06:52.671390
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b1f4e8a2c65'
+down_revision: Union[str, Sequence[str], None] = 'a93c5d2e6b17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ['users', 'admin_invites', 'habits', 'habit_check_ins', 'user_badges', 'ai_recommendations']
+
+FOREIGN_KEYS = [
+    ('admin_invites', 'invited_by'),
+    ('habits', 'user_id'),
+    ('habit_check_ins', 'habit_id'),
+    ('user_badges', 'user_id'),
+    ('ai_recommendations', 'user_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # SQLite keys are already 64-bit rowids; only Postgres needs converting
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table in TABLES:
+        # Swap the SERIAL sequence for an identity that continues after the current max id
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
+        op.execute(f"DROP SEQUENCE IF EXISTS {table}_id_seq")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY")
+        op.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}"
+        )
+    for table, column in FOREIGN_KEYS:
+        op.alter_column(table, column, existing_type=sa.Integer(), type_=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in FOREIGN_KEYS:
+        op.alter_column(table, column, existing_type=sa.BigInteger(), type_=sa.Integer(), existing_nullable=False)
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP IDENTITY")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id TYPE INTEGER")
+        op.execute(f"CREATE SEQUENCE {table}_id_seq OWNED BY {table}.id")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+        op.execute(f"SELECT setval('{table}_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM {table}")
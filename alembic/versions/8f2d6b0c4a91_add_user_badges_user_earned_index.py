@@ -0,0 +1,28 @@
+"""add user badges user/earned_at index
+
+Revision ID: 8f2d6b0c4a91
+Revises: 3c9a4e1f7b2d
+Create Date: 2026-10-15 11:02:17.540913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2d6b0c4a91'
+down_revision: Union[str, Sequence[str], None] = '3c9a4e1f7b2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_user_badges_user_earned', 'user_badges', ['user_id', sa.text('earned_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_user_badges_user_earned', table_name='user_badges')
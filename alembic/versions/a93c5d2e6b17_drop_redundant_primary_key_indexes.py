@@ -0,0 +1,38 @@
+"""drop redundant primary key indexes
+
+Revision ID: a93c5d2e6b17
+Revises: 5e8b2c71a0f4
+Create Date: 2026-10-15 13:41:09.226471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93c5d2e6b17'
+down_revision: Union[str, Sequence[str], None] = '5e8b2c71a0f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index(op.f('ix_habit_check_ins_id'), table_name='habit_check_ins')
+    op.drop_index(op.f('ix_user_badges_id'), table_name='user_badges')
+    op.drop_index(op.f('ix_habits_id'), table_name='habits')
+    op.drop_index(op.f('ix_ai_recommendations_id'), table_name='ai_recommendations')
+    op.drop_index(op.f('ix_admin_invites_id'), table_name='admin_invites')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_admin_invites_id'), 'admin_invites', ['id'], unique=False)
+    op.create_index(op.f('ix_ai_recommendations_id'), 'ai_recommendations', ['id'], unique=False)
+    op.create_index(op.f('ix_habits_id'), 'habits', ['id'], unique=False)
+    op.create_index(op.f('ix_user_badges_id'), 'user_badges', ['id'], unique=False)
+    op.create_index(op.f('ix_habit_check_ins_id'), 'habit_check_ins', ['id'], unique=False)
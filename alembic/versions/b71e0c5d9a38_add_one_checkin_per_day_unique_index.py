@@ -0,0 +1,33 @@
+"""add one check-in per habit per day unique index
+
+Revision ID: b71e0c5d9a38
+Revises: 8f2d6b0c4a91
+Create Date: 2026-10-15 11:47:52.083611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71e0c5d9a38'
+down_revision: Union[str, Sequence[str], None] = '8f2d6b0c4a91'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Keep only the earliest check-in of any habit/day pair so the unique index can be built
+    op.execute(
+        "DELETE FROM habit_check_ins WHERE id NOT IN ("
+        "SELECT MIN(id) FROM habit_check_ins GROUP BY habit_id, date(check_in_date))"
+    )
+    op.create_index('uq_checkin_habit_day', 'habit_check_ins', ['habit_id', sa.text('date(check_in_date)')], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_checkin_habit_day', table_name='habit_check_ins')
@@ -0,0 +1,67 @@
+"""add on delete cascade to foreign keys
+
+Revision ID: c28d9f5b7e03
+Revises: 7b1f4e8a2c65
+Create Date: 2026-10-15 14:52:18.340957
+
+"""
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c28d9f5b7e03'
+down_revision: Union[str, Sequence[str], None] = '7b1f4e8a2c65'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEYS = [
+    ('admin_invites', 'invited_by', 'users'),
+    ('habits', 'user_id', 'users'),
+    ('habit_check_ins', 'habit_id', 'habits'),
+    ('user_badges', 'user_id', 'users'),
+    ('ai_recommendations', 'user_id', 'users'),
+]
+
+# Lets batch mode address SQLite's unnamed foreign keys by name
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _replace_foreign_key(table: str, column: str, referred: str, ondelete: Optional[str]) -> None:
+    """Recreate the foreign key on `table.column` with the given ON DELETE action"""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        name = f'{table}_{column}_fkey'
+        op.drop_constraint(name, table, type_='foreignkey')
+        op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+        return
+
+    # SQLite rebuilds the table in batch mode, and reflection loses expression
+    # indexes and DESC ordering, so replay the original index DDL afterwards
+    saved_indexes = bind.execute(
+        sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+        {'table': table}
+    ).all()
+
+    name = f'fk_{table}_{column}_{referred}'
+    with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(name, type_='foreignkey')
+        batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+    for index_name, sql in saved_indexes:
+        op.execute(f'DROP INDEX IF EXISTS {index_name}')
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column, referred in FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, 'CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column, referred in FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, None)
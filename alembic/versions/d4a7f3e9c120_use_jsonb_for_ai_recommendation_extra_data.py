@@ -0,0 +1,44 @@
+"""use jsonb for ai_recommendations.extra_data with a gin index
+
+Revision ID: d4a7f3e9c120
+Revises: b71e0c5d9a38
+Create Date: 2026-10-15 12:20:14.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a7f3e9c120'
+down_revision: Union[str, Sequence[str], None] = 'b71e0c5d9a38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # jsonb and GIN are Postgres-only; other backends keep the generic JSON column
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column('ai_recommendations', 'extra_data',
+               existing_type=postgresql.JSON(astext_type=sa.Text()),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               postgresql_using='extra_data::jsonb',
+               existing_nullable=True)
+    op.create_index('ix_ai_extra_gin', 'ai_recommendations', ['extra_data'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_ai_extra_gin', table_name='ai_recommendations', postgresql_using='gin')
+    op.alter_column('ai_recommendations', 'extra_data',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=postgresql.JSON(astext_type=sa.Text()),
+               postgresql_using='extra_data::json',
+               existing_nullable=True)
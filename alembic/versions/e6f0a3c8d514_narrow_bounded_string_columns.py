@@ -0,0 +1,99 @@
+"""narrow bounded string columns and use enums for badge_type and role
+
+Revision ID: e6f0a3c8d514
+Revises: c28d9f5b7e03
+Create Date: 2026-10-15 15:31:44.172806
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f0a3c8d514'
+down_revision: Union[str, Sequence[str], None] = 'c28d9f5b7e03'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BADGE_TYPES = (
+    'streak_starter', 'week_warrior', 'month_master', 'habit_creator',
+    'consistency_king', 'early_bird', 'night_owl',
+)
+USER_ROLES = ('user', 'admin', 'super_admin')
+
+badge_type_enum = postgresql.ENUM(*BADGE_TYPES, name='badge_type_enum')
+role_enum = postgresql.ENUM(*USER_ROLES, name='role_enum')
+
+
+def _alter_columns(table: str, changes: list) -> None:
+    """Apply (column, alter_column kwargs) changes to `table`, keeping its indexes intact"""
+    bind = op.get_bind()
+    # SQLite rebuilds the table in batch mode, and reflection loses expression
+    # indexes and DESC ordering, so replay the original index DDL afterwards
+    saved_indexes = []
+    if bind.dialect.name == 'sqlite':
+        saved_indexes = bind.execute(
+            sa.text("SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = :table AND sql IS NOT NULL"),
+            {'table': table}
+        ).all()
+
+    with op.batch_alter_table(table) as batch_op:
+        for column, kwargs in changes:
+            batch_op.alter_column(column, **kwargs)
+
+    for name, sql in saved_indexes:
+        op.execute(f'DROP INDEX IF EXISTS {name}')
+        op.execute(sql)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name == 'postgresql':
+        badge_type_enum.create(op.get_bind(), checkfirst=True)
+        role_enum.create(op.get_bind(), checkfirst=True)
+
+    _alter_columns('user_badges', [
+        ('badge_type', dict(
+            existing_type=sa.String(length=50), existing_nullable=False,
+            type_=sa.Enum(*BADGE_TYPES, name='badge_type_enum'),
+            postgresql_using='badge_type::badge_type_enum',
+        )),
+    ])
+    _alter_columns('users', [
+        ('role', dict(
+            existing_type=sa.String(length=50), existing_nullable=False,
+            type_=sa.Enum(*USER_ROLES, name='role_enum'),
+            postgresql_using='role::role_enum',
+        )),
+    ])
+    _alter_columns('ai_recommendations', [
+        ('recommendation_type', dict(existing_type=sa.String(length=50), existing_nullable=False, type_=sa.String(length=32))),
+        ('source_ai', dict(existing_type=sa.String(length=50), existing_nullable=True, type_=sa.String(length=16))),
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _alter_columns('ai_recommendations', [
+        ('source_ai', dict(existing_type=sa.String(length=16), existing_nullable=True, type_=sa.String(length=50))),
+        ('recommendation_type', dict(existing_type=sa.String(length=32), existing_nullable=False, type_=sa.String(length=50))),
+    ])
+    _alter_columns('users', [
+        ('role', dict(
+            existing_type=sa.Enum(*USER_ROLES, name='role_enum'), existing_nullable=False,
+            type_=sa.String(length=50), postgresql_using='role::text',
+        )),
+    ])
+    _alter_columns('user_badges', [
+        ('badge_type', dict(
+            existing_type=sa.Enum(*BADGE_TYPES, name='badge_type_enum'), existing_nullable=False,
+            type_=sa.String(length=50), postgresql_using='badge_type::text',
+        )),
+    ])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        role_enum.drop(op.get_bind(), checkfirst=True)
+        badge_type_enum.drop(op.get_bind(), checkfirst=True)
@@ -1,15 +1,23 @@
 # auth_utils.py - Pure Authorization header based authentication
 from datetime import datetime, timedelta
+import asyncio
+import hashlib
+import secrets
 import time
 import os
+from collections import deque
 import bcrypt
+from cachetools import TTLCache
 from fastapi import Request, HTTPException, Depends
-from jose import JWTError, jwt
+import jwt
+from jwt import PyJWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, exists, lambda_stmt
 from dotenv import load_dotenv
 from database import get_db
 from model import User, AdminInvite
+from redis_client import redis_client
+from schema import MAX_PASSWORD_LENGTH
 
 load_dotenv()
 
@@ -18,18 +26,45 @@ SECRET_KEY = os.getenv("SECRET_KEY", "mysecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 ADMIN_CREATION_SECRET = os.getenv("ADMIN_CREATION_SECRET")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "10"))
+# bcrypt only uses the first 72 bytes; anything far longer is rejected outright
+BCRYPT_MAX_BYTES = 72
 
-# Rate limiting for admin operations
-admin_rate_limit = {}
+# In-process fallback for admin rate limiting when Redis is not configured:
+# key -> deque of attempt timestamps inside the sliding window
+_local_rate_limit = {}
+_LOCAL_RATE_LIMIT_MAX_KEYS = 10_000
 
-def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+# Decoded bearer tokens (token hash -> (email, exp)) so repeat requests with
+# the same token skip signature verification; hits past exp are ignored
+token_cache = TTLCache(maxsize=10_000, ttl=60)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify password against hash"""
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+def _token_cache_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()[:32]
+
+def invalidate_cached_token(token: str):
+    """Forget a decoded token, e.g. on logout"""
+    token_cache.pop(_token_cache_key(token), None)
+
+def _hash_password_sync(password: str) -> str:
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8')[:BCRYPT_MAX_BYTES], salt).decode('utf-8')
+
+def _verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode('utf-8')[:BCRYPT_MAX_BYTES], hashed_password.encode('utf-8'))
+
+async def hash_password(password: str) -> str:
+    """Hash password using bcrypt in a worker thread so the event loop is not blocked"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _hash_password_sync, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify password against hash in a worker thread so the event loop is not blocked"""
+    # Reject empty and oversized inputs before paying for the bcrypt key schedule
+    if not plain_password or len(plain_password) > MAX_PASSWORD_LENGTH:
+        return False
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _verify_password_sync, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -42,29 +77,40 @@ def verify_admin_creation_secret(secret: str) -> bool:
     """Verify the admin creation secret"""
     if not ADMIN_CREATION_SECRET:
         return False
-    return secret == ADMIN_CREATION_SECRET
+    # Constant-time comparison so response timing does not leak matching prefixes
+    return secrets.compare_digest(secret.encode('utf-8'), ADMIN_CREATION_SECRET.encode('utf-8'))
 
-def rate_limit_admin_operations(ip_address: str, max_attempts: int = 5, window_minutes: int = 15):
-    """Rate limit admin operations by IP"""
+async def rate_limit_admin_operations(ip_address: str, max_attempts: int = 5, window_minutes: int = 15) -> bool:
+    """Rate limit admin operations by IP over a sliding window"""
+    key = f"ratelimit:admin:{ip_address}"
+    window_seconds = window_minutes * 60
     current_time = time.time()
-    window_start = current_time - (window_minutes * 60)
+    window_start = current_time - window_seconds
     
-    if ip_address not in admin_rate_limit:
-        admin_rate_limit[ip_address] = []
+    if redis_client is not None:
+        # Sorted set of attempt timestamps: trim what slid out of the window,
+        # record this attempt and count, atomically and shared by all workers
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(key, 0, window_start)
+            pipe.zadd(key, {f"{current_time}:{secrets.token_hex(4)}": current_time})
+            pipe.zcard(key)
+            pipe.expire(key, window_seconds)
+            _, _, attempts, _ = await pipe.execute()
+        return attempts <= max_attempts
     
-    # Clean old attempts
-    admin_rate_limit[ip_address] = [
-        attempt_time for attempt_time in admin_rate_limit[ip_address]
-        if attempt_time > window_start
-    ]
+    # Drop idle keys so the map stays bounded
+    if len(_local_rate_limit) >= _LOCAL_RATE_LIMIT_MAX_KEYS:
+        for idle_key in [k for k, attempts in _local_rate_limit.items() if attempts[-1] <= window_start]:
+            del _local_rate_limit[idle_key]
     
-    # Check if rate limit exceeded
-    if len(admin_rate_limit[ip_address]) >= max_attempts:
-        return False
+    attempts = _local_rate_limit.setdefault(key, deque())
+    while attempts and attempts[0] <= window_start:
+        attempts.popleft()
     
-    # Record this attempt
-    admin_rate_limit[ip_address].append(current_time)
-    return True
+    # Record this attempt before counting, rejected ones included, as the
+    # Redis path does, so a client that keeps retrying stays locked out
+    attempts.append(current_time)
+    return len(attempts) <= max_attempts
 
 async def create_first_admin_if_none_exist(email: str, password: str, secret: str, db: AsyncSession) -> bool:
     """Create first admin if no admins exist and secret is correct"""
@@ -73,23 +119,21 @@ async def create_first_admin_if_none_exist(email: str, password: str, secret: st
         return False
     
     # Check if any admin exists
-    result = await db.execute(
-        select(User).where(User.role.in_(["admin", "super_admin"]))
+    existing_admin = await db.scalar(
+        select(exists().where(User.role.in_(["admin", "super_admin"])))
     )
-    existing_admin = result.scalar_one_or_none()
     
     if existing_admin:
         return False  # Admin already exists
     
     # Check if user email already exists
-    result = await db.execute(select(User).where(User.email == email))
-    existing_user = result.scalar_one_or_none()
+    existing_user = await db.scalar(select(exists().where(User.email == email)))
     
     if existing_user:
         return False  # User already exists
     
     # Create super admin
-    hashed_password = hash_password(password)
+    hashed_password = await hash_password(password)
     super_admin = User(
         email=email,
         hashed_password=hashed_password,
@@ -117,18 +161,27 @@ async def get_current_user(request: Request, db: AsyncSession = Depends(get_db))
         raise HTTPException(status_code=401, detail="Token is empty")
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
+        token_key = _token_cache_key(token)
+        cached_token = token_cache.get(token_key)
+        if cached_token is not None and cached_token[1] > time.time():
+            email = cached_token[0]
+        else:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise HTTPException(status_code=401, detail="Invalid token payload")
+            token_cache[token_key] = (email, payload["exp"])
         
-        result = await db.execute(select(User).where(User.email == email))
+        # Loaded on every request, never cached: role, is_active and points
+        # must reflect writes made by any worker. lambda_stmt: built and
+        # cache-keyed once, only email binds per call
+        result = await db.execute(lambda_stmt(lambda: select(User).where(User.email == email)))
         user = result.scalar_one_or_none()
         if user is None:
             raise HTTPException(status_code=401, detail="User not found")
         
         return user
-    except JWTError as e:
+    except PyJWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 async def get_current_admin(request: Request, db: AsyncSession = Depends(get_db)):
@@ -0,0 +1,43 @@
+# cache.py
+from typing import Optional
+from cachetools import TLRUCache
+from redis_client import redis_client
+
+CACHE_MAX_ENTRIES = 10_000
+
+# In-process fallback when Redis is not configured; each entry is stored as
+# (value, ttl) so keys can expire on their own schedule
+_local_cache = TLRUCache(
+    maxsize=CACHE_MAX_ENTRIES,
+    ttu=lambda _key, entry, now: now + entry[1]
+)
+
+async def cache_get(key: str) -> Optional[str]:
+    """Return the cached string for `key`, or None on a miss"""
+    if redis_client is not None:
+        return await redis_client.get(key)
+    entry = _local_cache.get(key)
+    return entry[0] if entry is not None else None
+
+async def cache_set(key: str, value: str, ttl_seconds: int):
+    """Cache `value` under `key` for `ttl_seconds`"""
+    if redis_client is not None:
+        await redis_client.set(key, value, ex=ttl_seconds)
+    else:
+        _local_cache[key] = (value, ttl_seconds)
+
+async def cache_add(key: str, value: str, ttl_seconds: int) -> bool:
+    """Cache `value` only if `key` is absent; True when this call stored it"""
+    if redis_client is not None:
+        return bool(await redis_client.set(key, value, ex=ttl_seconds, nx=True))
+    if key in _local_cache:
+        return False
+    _local_cache[key] = (value, ttl_seconds)
+    return True
+
+async def cache_delete(key: str):
+    """Invalidate `key` after the data behind it changes"""
+    if redis_client is not None:
+        await redis_client.delete(key)
+    else:
+        _local_cache.pop(key, None)
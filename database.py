@@ -1,7 +1,11 @@
 # database.py
 import os
 import logging
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,14 +28,52 @@ elif DATABASE_URL.startswith("postgresql://"):
 
 logger.info(f"Final DATABASE_URL driver: {DATABASE_URL.split('://')[0]}")
 
+# Connection pool sizing, overridable per deployment
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds
+
+# Set when connecting through PgBouncer in transaction mode, which cannot
+# keep server-side prepared statements across pooled connections
+DB_USE_PGBOUNCER = os.getenv("DB_USE_PGBOUNCER", "false").lower() == "true"
+
+connect_args = {}
+if DATABASE_URL.startswith("postgresql+asyncpg://"):
+    if DB_USE_PGBOUNCER:
+        connect_args = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+        }
+    else:
+        # Reuse prepared statements instead of re-parsing/planning on every query
+        connect_args = {
+            "statement_cache_size": 1024,
+            "prepared_statement_cache_size": 512,
+        }
+
 try:
     engine = create_async_engine(
         DATABASE_URL,
         echo=False,
         future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
         pool_pre_ping=True,  # Verify connections before using
+        connect_args=connect_args,
     )
     
+    if engine.dialect.name == "sqlite":
+        # SQLite ignores foreign keys (and so ON DELETE CASCADE) unless enabled per connection
+        @event.listens_for(engine.sync_engine, "connect")
+        def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+    
     AsyncSessionLocal = async_sessionmaker(
         engine,
         class_=AsyncSession,
@@ -44,6 +86,12 @@ except Exception as e:
     logger.error(f"Failed to configure database: {str(e)}")
     raise
 
+def dialect_insert(session: AsyncSession):
+    """Return the insert() construct of the session's dialect, for ON CONFLICT support"""
+    if session.bind.dialect.name == "postgresql":
+        return postgresql_insert
+    return sqlite_insert
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
@@ -1,86 +1,188 @@
-from typing import List
+import asyncio
+import logging
+import os
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, update, func, and_, case, literal, Date
+from cache import cache_delete
+from database import AsyncSessionLocal
 from model import User, Habit, HabitCheckIn, UserBadge, BadgeType
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Points, level and streaks only change on check-in, so /stats is served
+# from cache between writes; the TTL bounds staleness from any missed path
+USER_STATS_TTL_SECONDS = 30
+USER_BADGES_TTL_SECONDS = 30
+
+def user_stats_key(user_id: int) -> str:
+    """Cache key of a user's /stats payload"""
+    return f"user:{user_id}:stats"
+
+def user_badges_key(user_id: int) -> str:
+    """Cache key of a user's /badges payload"""
+    return f"user:{user_id}:badges"
+
+# Users whose badges need re-checking; the badge worker drains the set
+# periodically, so a burst of check-ins by one user costs a single pass
+BADGE_WORKER_INTERVAL_SECONDS = float(os.getenv("BADGE_WORKER_INTERVAL_SECONDS", "10"))
+_pending_badge_users: Set[int] = set()
+
+async def run_in_new_session(query: Callable[[AsyncSession], Awaitable[T]]) -> T:
+    """Run a query on its own session so it can overlap with others via asyncio.gather"""
+    # Each call checks out another pooled connection: only use this where the
+    # caller holds no connection of its own (background tasks, or a route
+    # after releasing its request session), or concurrent requests can
+    # exhaust the pool while each waits for a second connection
+    async with AsyncSessionLocal() as session:
+        return await query(session)
+
+def _days_ago(column, today: date, dialect_name: str):
+    """SQL expression for the number of whole days between `column` and `today`"""
+    if dialect_name == "postgresql":
+        return literal(today, type_=Date) - func.date(column)
+    # SQLite: julianday() of two midnights differs by a whole number of days
+    return func.julianday(today.isoformat()) - func.julianday(func.date(column))
 
 class GamificationService:
     
     @staticmethod
     async def award_points(user_id: int, points: int, db: AsyncSession):
         """Award points to user and update level"""
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
-        
-        if user:
-            user.total_points += points
-            # Level up every 1000 points
-            user.level = (user.total_points // 1000) + 1
-            await db.commit()
+        # Single atomic UPDATE: no read-modify-write round trip, and concurrent
+        # check-ins cannot overwrite each other's points
+        new_total = User.total_points + points
+        await db.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(
+                total_points=new_total,
+                level=new_total // 1000 + 1  # Level up every 1000 points
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    
+    @staticmethod
+    async def award_points_in_background(user_id: int, points: int):
+        """Background task: award points on a fresh session after the response is sent"""
+        async with AsyncSessionLocal() as session:
+            await GamificationService.award_points(user_id, points, session)
+        await GamificationService.invalidate_user_stats(user_id)
+    
+    @staticmethod
+    async def invalidate_user_stats(user_id: int):
+        """Drop the cached /stats payload after the user's habits or check-ins change"""
+        await cache_delete(user_stats_key(user_id))
     
     @staticmethod
     async def check_and_award_badges(user_id: int, db: AsyncSession) -> List[UserBadge]:
         """Check for new badges and award them"""
         newly_awarded = []
         
-        # Get user data
-        result = await db.execute(
-            select(User).where(User.id == user_id)
+        async def load_badge_types(session: AsyncSession) -> set:
+            result = await session.execute(
+                select(UserBadge.badge_type).where(UserBadge.user_id == user_id)
+            )
+            return set(result.scalars().all())
+        
+        # Get existing badges and every badge aggregate concurrently
+        existing_badges, totals = await asyncio.gather(
+            run_in_new_session(load_badge_types),
+            run_in_new_session(lambda session: GamificationService._get_badge_totals(user_id, session))
         )
-        user = result.scalar_one_or_none()
-        if not user:
+        if not totals.user_exists:
             return newly_awarded
         
-        # Get existing badges
-        existing_badges_result = await db.execute(
-            select(UserBadge).where(UserBadge.user_id == user_id)
+        newly_awarded.extend(
+            GamificationService._check_streak_badges(user_id, totals.max_streak, existing_badges)
+        )
+        newly_awarded.extend(
+            GamificationService._check_creation_badges(user_id, totals.total_habits, existing_badges)
+        )
+        newly_awarded.extend(
+            GamificationService._check_consistency_badges(
+                user_id, totals.active_habits, totals.recent_checkins, existing_badges
+            )
         )
-        existing_badges = {badge.badge_type for badge in existing_badges_result.scalars().all()}
-        
-        # Check for streak badges
-        streak_badges = await GamificationService._check_streak_badges(user_id, db, existing_badges)
-        newly_awarded.extend(streak_badges)
-        
-        # Check for habit creation badges
-        creation_badges = await GamificationService._check_creation_badges(user_id, db, existing_badges)
-        newly_awarded.extend(creation_badges)
-        
-        # Check for consistency badges
-        consistency_badges = await GamificationService._check_consistency_badges(user_id, db, existing_badges)
-        newly_awarded.extend(consistency_badges)
-        
-        # Save new badges
-        for badge in newly_awarded:
-            db.add(badge)
         
+        # Save new badges; the unit of work flushes them as one batched INSERT
         if newly_awarded:
+            db.add_all(newly_awarded)
             await db.commit()
+            await cache_delete(user_badges_key(user_id))
         
         return newly_awarded
     
     @staticmethod
-    async def _check_streak_badges(user_id: int, db: AsyncSession, existing_badges: set) -> List[UserBadge]:
-        """Check for streak-based badges"""
-        badges = []
+    def queue_badge_check(user_id: int):
+        """Schedule a badge check for the user on the next badge worker pass"""
+        _pending_badge_users.add(user_id)
+    
+    @staticmethod
+    async def process_pending_badges():
+        """Check badges for every user queued since the last pass"""
+        # Copy and clear with no await in between, so nothing queued meanwhile is lost
+        user_ids = sorted(_pending_badge_users)
+        _pending_badge_users.clear()
+        for user_id in user_ids:
+            try:
+                await GamificationService.award_badges_in_background(user_id)
+            except Exception:
+                logger.exception("Badge check failed for user %s", user_id)
+    
+    @staticmethod
+    async def run_badge_worker():
+        """Drain the badge queue every BADGE_WORKER_INTERVAL_SECONDS until cancelled"""
+        while True:
+            await asyncio.sleep(BADGE_WORKER_INTERVAL_SECONDS)
+            await GamificationService.process_pending_badges()
+    
+    @staticmethod
+    async def award_badges_in_background(user_id: int):
+        """Background task: check badges on a fresh session after the response is sent"""
+        async with AsyncSessionLocal() as session:
+            newly_awarded = await GamificationService.check_and_award_badges(user_id, session)
+        if newly_awarded:
+            await GamificationService.invalidate_user_stats(user_id)
+    
+    @staticmethod
+    async def _get_badge_totals(user_id: int, db: AsyncSession):
+        """Fetch every aggregate the badge checks need in a single round-trip"""
+        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
+        stats = GamificationService._checkin_stats_query(user_id, db.bind.dialect.name).subquery()
         
-        # Get user's best current streak
         result = await db.execute(
-            select(Habit).where(and_(Habit.user_id == user_id, Habit.is_active == True))
-        )
-        habits = result.scalars().all()
-        
-        max_streak = 0
-        for habit in habits:
-            # Calculate current streak for this habit
-            checkins_result = await db.execute(
-                select(HabitCheckIn)
-                .where(HabitCheckIn.habit_id == habit.id)
-                .order_by(HabitCheckIn.check_in_date.desc())
+            select(
+                select(func.count(User.id))
+                .where(User.id == user_id)
+                .scalar_subquery().label("user_exists"),
+                select(func.coalesce(func.max(stats.c.streak), 0))
+                .scalar_subquery().label("max_streak"),
+                select(func.count(Habit.id))
+                .where(Habit.user_id == user_id)
+                .scalar_subquery().label("total_habits"),
+                select(func.count(Habit.id))
+                .where(and_(Habit.user_id == user_id, Habit.is_active == True))
+                .scalar_subquery().label("active_habits"),
+                select(func.count(HabitCheckIn.id))
+                .join(Habit)
+                .where(and_(
+                    Habit.user_id == user_id,
+                    HabitCheckIn.check_in_date >= thirty_days_ago
+                ))
+                .scalar_subquery().label("recent_checkins")
             )
-            checkins = checkins_result.scalars().all()
-            
-            streak = GamificationService._calculate_streak(checkins)
-            max_streak = max(max_streak, streak)
+        )
+        return result.one()
+    
+    @staticmethod
+    def _check_streak_badges(user_id: int, max_streak: int, existing_badges: set) -> List[UserBadge]:
+        """Check for streak-based badges given the user's best current streak"""
+        badges = []
         
         # Award streak badges
         if max_streak >= 30 and BadgeType.MONTH_MASTER not in existing_badges:
@@ -108,16 +210,10 @@ class GamificationService:
         return badges
     
     @staticmethod
-    async def _check_creation_badges(user_id: int, db: AsyncSession, existing_badges: set) -> List[UserBadge]:
-        """Check for habit creation badges"""
+    def _check_creation_badges(user_id: int, total_habits: int, existing_badges: set) -> List[UserBadge]:
+        """Check for habit creation badges given the total number of habits created"""
         badges = []
         
-        # Count total habits created
-        result = await db.execute(
-            select(func.count(Habit.id)).where(Habit.user_id == user_id)
-        )
-        total_habits = result.scalar()
-        
         if total_habits >= 5 and BadgeType.HABIT_CREATOR not in existing_badges:
             badges.append(UserBadge(
                 user_id=user_id,
@@ -129,33 +225,16 @@ class GamificationService:
         return badges
     
     @staticmethod
-    async def _check_consistency_badges(user_id: int, db: AsyncSession, existing_badges: set) -> List[UserBadge]:
-        """Check for consistency badges"""
+    def _check_consistency_badges(
+        user_id: int, active_habits: int, recent_checkins: int, existing_badges: set
+    ) -> List[UserBadge]:
+        """Check for consistency badges given active habits and check-ins in the last 30 days"""
         badges = []
         
-        # Calculate overall completion rate for last 30 days
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
         # This is a simplified calculation - you might want to make it more sophisticated
-        habits_result = await db.execute(
-            select(Habit).where(and_(Habit.user_id == user_id, Habit.is_active == True))
-        )
-        habits = habits_result.scalars().all()
-        
-        if habits:
-            total_expected = len(habits) * 30  # Assuming daily habits
-            
-            checkins_result = await db.execute(
-                select(func.count(HabitCheckIn.id))
-                .join(Habit)
-                .where(and_(
-                    Habit.user_id == user_id,
-                    HabitCheckIn.check_in_date >= thirty_days_ago
-                ))
-            )
-            total_checkins = checkins_result.scalar()
-            
-            completion_rate = (total_checkins / total_expected) * 100 if total_expected > 0 else 0
+        if active_habits:
+            total_expected = active_habits * 30  # Assuming daily habits
+            completion_rate = (recent_checkins / total_expected) * 100 if total_expected > 0 else 0
             
             if completion_rate >= 90 and BadgeType.CONSISTENCY_KING not in existing_badges:
                 badges.append(UserBadge(
@@ -168,24 +247,75 @@ class GamificationService:
         return badges
     
     @staticmethod
-    def _calculate_streak(checkins: List[HabitCheckIn]) -> int:
-        """Calculate current streak from checkins"""
+    def _checkin_stats_query(user_id: int, dialect_name: str, since: Optional[datetime] = None):
+        """Build a query of (habit_id, checkin_count, streak) per active habit"""
+        today = datetime.utcnow().date()
+        conditions = [Habit.user_id == user_id, Habit.is_active == True]
+        if since is not None:
+            conditions.append(HabitCheckIn.check_in_date >= since)
+        
+        # Rank each habit's distinct check-in days newest first; the streak holds
+        # while the n-th most recent day falls exactly n - 1 days before today
+        ranked = (
+            select(
+                HabitCheckIn.habit_id,
+                _days_ago(HabitCheckIn.check_in_date, today, dialect_name).label("days_ago"),
+                func.dense_rank().over(
+                    partition_by=HabitCheckIn.habit_id,
+                    order_by=func.date(HabitCheckIn.check_in_date).desc()
+                ).label("rn")
+            )
+            .join(Habit)
+            .where(and_(*conditions))
+            .cte("ranked_checkins")
+        )
+        
+        first_break = func.min(case((ranked.c.days_ago != ranked.c.rn - 1, ranked.c.rn)))
+        return (
+            select(
+                ranked.c.habit_id,
+                func.count().label("checkin_count"),
+                func.coalesce(first_break - 1, func.max(ranked.c.rn)).label("streak")
+            )
+            .group_by(ranked.c.habit_id)
+        )
+    
+    @staticmethod
+    async def get_checkin_stats(
+        user_id: int, db: AsyncSession, since: Optional[datetime] = None
+    ) -> Dict[int, Tuple[int, int]]:
+        """Get (check-in count, current streak) per active habit, aggregated in SQL"""
+        result = await db.execute(
+            GamificationService._checkin_stats_query(user_id, db.bind.dialect.name, since)
+        )
+        return {habit_id: (count, streak) for habit_id, count, streak in result.all()}
+    
+    @staticmethod
+    async def get_active_streaks(user_id: int, db: AsyncSession) -> List[int]:
+        """Get the current streak of every active habit (0 if never checked in), computed in SQL"""
+        stats = GamificationService._checkin_stats_query(user_id, db.bind.dialect.name).subquery()
+        result = await db.execute(
+            select(func.coalesce(stats.c.streak, 0))
+            .select_from(Habit)
+            .outerjoin(stats, stats.c.habit_id == Habit.id)
+            .where(and_(Habit.user_id == user_id, Habit.is_active == True))
+        )
+        return list(result.scalars().all())
+    
+    @staticmethod
+    def _calculate_streak(checkins: List[HabitCheckIn], today: Optional[int] = None) -> int:
+        """Calculate current streak from checkins; `today` is a day ordinal callers in loops pass once"""
         if not checkins:
             return 0
         
-        # Sort by date (most recent first)
-        sorted_checkins = sorted(checkins, key=lambda x: x.check_in_date, reverse=True)
+        # Walk back from today through the set of distinct check-in days;
+        # no sort needed, and same-day duplicates cannot break the streak
+        checkin_days = {checkin.check_in_date.toordinal() for checkin in checkins}
+        if today is None:
+            today = datetime.utcnow().toordinal()
         
         streak = 0
-        current_date = datetime.utcnow().date()
-        
-        for checkin in sorted_checkins:
-            checkin_date = checkin.check_in_date.date()
-            expected_date = current_date - timedelta(days=streak)
-            
-            if checkin_date == expected_date:
-                streak += 1
-            else:
-                break
+        while today - streak in checkin_days:
+            streak += 1
         
-        return streak
\ No newline at end of file
+        return streak
@@ -1,32 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
 import uvicorn
+from database import engine
+from gamification_service import GamificationService
 from routes.routes import router
+from schema import HealthResponse, MessageResponse
 import os
+import re
 
-app = FastAPI(title="Habit Tracker API", version="1.0.0")
+# Interactive docs are on by default; set ENABLE_DOCS=false in production
+ENABLE_DOCS = os.getenv("ENABLE_DOCS", "true").lower() == "true"
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Compile mappers, open the first pooled connection and start the badge worker"""
+    configure_mappers()
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT 1"))
+    if ENABLE_DOCS:
+        # FastAPI memoizes the schema on the app; build it now rather than on the first /docs hit
+        app.openapi()
+    badge_worker = asyncio.create_task(GamificationService.run_badge_worker())
+    yield
+    badge_worker.cancel()
+    try:
+        await badge_worker
+    except asyncio.CancelledError:
+        pass
+    # Award anything still queued before the pool goes away
+    await GamificationService.process_pending_badges()
+    await engine.dispose()
+
+app = FastAPI(
+    title="Habit Tracker API",
+    version="1.0.0",
+    lifespan=lifespan,
+    docs_url="/docs" if ENABLE_DOCS else None,
+    redoc_url="/redoc" if ENABLE_DOCS else None,
+    openapi_url="/openapi.json" if ENABLE_DOCS else None,
+)
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
+# Add your frontend URLs here. Browsers send Origin without a trailing slash,
+# so strip one from FRONTEND_URL or the configured origin would never match
+CORS_ORIGINS = {FRONTEND_URL.rstrip("/"), "https://habit-tracker-frontend-eta.vercel.app", "http://localhost:3000"}
+CORS_ORIGIN_REGEX = "^(" + "|".join(re.escape(origin) for origin in sorted(CORS_ORIGINS)) + ")$"
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins= [FRONTEND_URL , "https://habit-tracker-frontend-eta.vercel.app" , "http://localhost:3000"],  # Add your frontend URLs
+    allow_origin_regex=CORS_ORIGIN_REGEX,
     allow_credentials=True,
-    allow_methods=["*"],
+    allow_methods=["GET", "POST", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Paginated admin lists return the next page's cursor in this header
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routes
 app.include_router(router, prefix="/api")
 
-@app.get("/")
+# Declared response models let FastAPI serialize straight to JSON bytes in
+# pydantic-core, skipping jsonable_encoder and json.dumps
+@app.get("/", response_model=MessageResponse)
 async def root():
     return {"message": "Habit Tracker API"}
 
-@app.get("/health")
+@app.get("/health", response_model=HealthResponse)
 async def health_check():
     return {"status": "healthy"}
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Dev stays single-worker; deployments set WEB_CONCURRENCY (e.g. 2 * cores + 1).
+    # Workers need the app as an import string so uvicorn can spawn them
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        loop="asyncio" if os.name == "nt" else "uvloop",  # uvloop has no Windows build
+        http="httptools",
+        log_level=os.getenv("LOG_LEVEL", "warning"),
+    )
\ No newline at end of file
@@ -1,9 +1,32 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, JSON
-from sqlalchemy.orm import declarative_base, relationship
+from sqlalchemy import BigInteger, Enum as SQLEnum, Identity, Integer, String, DateTime, Text, ForeignKey, Boolean, Float, JSON, Index, text, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from sqlalchemy.sql.expression import FunctionElement
 from datetime import datetime
 from enum import Enum
+from typing import List, Optional
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    # Fetch server-generated values (ids, timestamps) via RETURNING in the
+    # same statement instead of expiring them for a later SELECT
+    __mapper_args__ = {"eager_defaults": True}
+
+# 64-bit keys on Postgres; SQLite only auto-increments an INTEGER PRIMARY KEY
+BigIntId = BigInteger().with_variant(Integer, "sqlite")
+
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, evaluated by the database"""
+    type = DateTime()
+    inherit_cache = True
+
+@compiles(utcnow, "postgresql")
+def _pg_utcnow(element, compiler, **kw):
+    return "timezone('utc', now())"
+
+@compiles(utcnow, "sqlite")
+def _sqlite_utcnow(element, compiler, **kw):
+    return "CURRENT_TIMESTAMP"
 
 class BadgeType(str, Enum):
     STREAK_STARTER = "streak_starter"  # 3 day streak
@@ -14,100 +37,155 @@ class BadgeType(str, Enum):
     EARLY_BIRD = "early_bird"         # Check-in before 8 AM
     NIGHT_OWL = "night_owl"          # Check-in after 10 PM
 
-class AdminInvite(Base):
+# Precomputed lookups for validating stored badge_type strings without going
+# through Enum.__contains__ / BadgeType(value)
+BADGE_VALUES = frozenset(badge.value for badge in BadgeType)
+BADGE_BY_VALUE = {badge.value: badge for badge in BadgeType}
+
+USER_ROLES = ("user", "admin", "super_admin")
+
+class CreatedAtMixin:
+    """Adds a database-generated created_at timestamp"""
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=utcnow())
+
+class TimestampMixin(CreatedAtMixin):
+    """Adds created_at plus an updated_at that the UPDATE statement itself refreshes"""
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=utcnow(), onupdate=utcnow())
+
+# Indexing policy: every index is an extra B-tree write on each INSERT/UPDATE.
+# Primary keys are already indexed, and low-cardinality columns (badge_type,
+# recommendation_type, category, role) are too unselective to index alone;
+# filters on them go through composite indexes led by user_id/habit_id.
+
+class AdminInvite(CreatedAtMixin, Base):
     __tablename__ = "admin_invites"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), nullable=False, index=True)
-    invite_token = Column(String(255), unique=True, nullable=False, index=True)
-    invited_by = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime, nullable=False)
-    is_used = Column(Boolean, default=False, nullable=False)
-    used_at = Column(DateTime)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), index=True)
+    invite_token: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    invited_by: Mapped[int] = mapped_column(BigIntId, ForeignKey("users.id", ondelete="CASCADE"))
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
+    is_used: Mapped[bool] = mapped_column(Boolean, default=False)
+    used_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
     
     # Relationship
-    inviter = relationship("User", foreign_keys=[invited_by])
+    inviter: Mapped["User"] = relationship(foreign_keys=[invited_by], lazy="raise")
 
-class User(Base):
+class User(TimestampMixin, Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String(255), unique=True, index=True, nullable=False)
-    hashed_password = Column(String(255), nullable=False)
-    role = Column(String(50), default="user", nullable=False)
-    is_active = Column(Boolean, default=True, nullable=False)
-    total_points = Column(Integer, default=0, nullable=False)
-    level = Column(Integer, default=1, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    email: Mapped[str] = mapped_column(String(255), unique=True, index=True)
+    hashed_password: Mapped[str] = mapped_column(String(255))
+    role: Mapped[str] = mapped_column(SQLEnum(*USER_ROLES, name="role_enum"), default="user")
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    total_points: Mapped[int] = mapped_column(Integer, default=0)
+    level: Mapped[int] = mapped_column(Integer, default=1)
     
-    # Relationships
-    habits = relationship("Habit", back_populates="user", cascade="all, delete-orphan")
-    badges = relationship("UserBadge", back_populates="user", cascade="all, delete-orphan")
-    ai_recommendations = relationship("AIRecommendation", back_populates="user", cascade="all, delete-orphan")
+    # Relationships; children are removed by ON DELETE CASCADE in the database,
+    # so passive_deletes skips loading them just to delete them one by one
+    habits: Mapped[List["Habit"]] = relationship(back_populates="user", cascade="all, delete-orphan", passive_deletes=True, lazy="raise")
+    badges: Mapped[List["UserBadge"]] = relationship(back_populates="user", cascade="all, delete-orphan", passive_deletes=True, lazy="raise")
+    ai_recommendations: Mapped[List["AIRecommendation"]] = relationship(back_populates="user", cascade="all, delete-orphan", passive_deletes=True, lazy="raise")
 
-class Habit(Base):
+class Habit(TimestampMixin, Base):
     __tablename__ = "habits"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(255), nullable=False)
-    description = Column(Text)
-    category = Column(String(100))  # health, productivity, learning, etc.
-    difficulty_level = Column(Integer, default=1)  # 1-5 scale
-    target_frequency = Column(String(50), default="daily")  # daily, weekly, monthly
-    start_date = Column(DateTime, default=datetime.utcnow, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    is_active = Column(Boolean, default=True, nullable=False)
-    points_per_completion = Column(Integer, default=10, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    name: Mapped[str] = mapped_column(String(255))
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    category: Mapped[Optional[str]] = mapped_column(String(100))  # health, productivity, learning, etc.
+    difficulty_level: Mapped[Optional[int]] = mapped_column(Integer, default=1)  # 1-5 scale
+    target_frequency: Mapped[Optional[str]] = mapped_column(String(50), default="daily")  # daily, weekly, monthly
+    start_date: Mapped[datetime] = mapped_column(DateTime, server_default=utcnow())
+    user_id: Mapped[int] = mapped_column(BigIntId, ForeignKey("users.id", ondelete="CASCADE"))
+    is_active: Mapped[bool] = mapped_column(Boolean, default=True)
+    points_per_completion: Mapped[int] = mapped_column(Integer, default=10)
     
     # Relationships
-    user = relationship("User", back_populates="habits")
-    check_ins = relationship("HabitCheckIn", back_populates="habit", cascade="all, delete-orphan")
+    user: Mapped["User"] = relationship(back_populates="habits", lazy="raise")
+    # Check-ins are rendered with their habit almost everywhere, so load them eagerly
+    check_ins: Mapped[List["HabitCheckIn"]] = relationship(back_populates="habit", cascade="all, delete-orphan", passive_deletes=True, lazy="selectin")
+    
+    __table_args__ = (
+        # Partial index for the "active habits of a user" lookups
+        Index(
+            "ix_habit_user_active", user_id,
+            postgresql_where=text("is_active"),
+            sqlite_where=text("is_active = 1")
+        ),
+    )
 
-class HabitCheckIn(Base):
+class HabitCheckIn(CreatedAtMixin, Base):
     __tablename__ = "habit_check_ins"
     
-    id = Column(Integer, primary_key=True, index=True)
-    habit_id = Column(Integer, ForeignKey("habits.id"), nullable=False)
-    check_in_date = Column(DateTime, default=datetime.utcnow, nullable=False)
-    notes = Column(Text)
-    mood_rating = Column(Integer)  # 1-5 scale for tracking mood
-    points_earned = Column(Integer, default=10, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    habit_id: Mapped[int] = mapped_column(BigIntId, ForeignKey("habits.id", ondelete="CASCADE"))
+    check_in_date: Mapped[datetime] = mapped_column(DateTime, server_default=utcnow())
+    notes: Mapped[Optional[str]] = mapped_column(Text)
+    mood_rating: Mapped[Optional[int]] = mapped_column(Integer)  # 1-5 scale for tracking mood
+    points_earned: Mapped[int] = mapped_column(Integer, default=10)
     
     # Relationship
-    habit = relationship("Habit", back_populates="check_ins")
+    habit: Mapped["Habit"] = relationship(back_populates="check_ins", lazy="raise")
+    
+    __table_args__ = (
+        # Serves per-habit check-in lookups ordered or filtered by date
+        Index("ix_hci_habit_date", habit_id, check_in_date.desc()),
+        # At most one check-in per habit per calendar day, enforced by the DB
+        Index("uq_checkin_habit_day", habit_id, func.date(check_in_date), unique=True),
+    )
 
 class UserBadge(Base):
     __tablename__ = "user_badges"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    badge_type = Column(String(50), nullable=False)
-    badge_name = Column(String(255), nullable=False)
-    badge_description = Column(Text)
-    earned_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigIntId, ForeignKey("users.id", ondelete="CASCADE"))
+    # Native enum on Postgres, stored by value ("week_warrior") as before
+    badge_type: Mapped[BadgeType] = mapped_column(
+        SQLEnum(BadgeType, name="badge_type_enum", values_callable=lambda badges: [badge.value for badge in badges])
+    )
+    badge_name: Mapped[str] = mapped_column(String(255))
+    badge_description: Mapped[Optional[str]] = mapped_column(Text)
+    earned_at: Mapped[datetime] = mapped_column(DateTime, server_default=utcnow())
     
     # Relationship
-    user = relationship("User", back_populates="badges")
+    user: Mapped["User"] = relationship(back_populates="badges", lazy="raise")
+    
+    __table_args__ = (
+        # Serves the newest-first badge listings in /badges and /stats
+        Index("ix_user_badges_user_earned", user_id, earned_at.desc()),
+    )
 
-class AIRecommendation(Base):
+class AIRecommendation(CreatedAtMixin, Base):
     __tablename__ = "ai_recommendations"
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    recommendation_type = Column(String(50), nullable=False)
-    title = Column(String(255), nullable=False)
-    content = Column(Text, nullable=False)
-    priority = Column(Integer, default=1)
-    is_read = Column(Boolean, default=False)
-    source_ai = Column(String(50))
-    extra_data = Column(JSON)  # Changed from 'metadata' to 'extra_data'
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime)
+    id: Mapped[int] = mapped_column(BigIntId, Identity(), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigIntId, ForeignKey("users.id", ondelete="CASCADE"))
+    recommendation_type: Mapped[str] = mapped_column(String(32))
+    title: Mapped[str] = mapped_column(String(255))
+    content: Mapped[str] = mapped_column(Text)
+    priority: Mapped[Optional[int]] = mapped_column(Integer, default=1)
+    is_read: Mapped[Optional[bool]] = mapped_column(Boolean, default=False)
+    source_ai: Mapped[Optional[str]] = mapped_column(String(16))
+    # Stored as pre-parsed jsonb on Postgres; plain JSON on other backends
+    extra_data: Mapped[Optional[dict]] = mapped_column(JSON().with_variant(JSONB(), "postgresql"))  # Changed from 'metadata' to 'extra_data'
+    expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime)
+    
+    __table_args__ = (
+        # Index-backed key and containment (@>) lookups into extra_data
+        Index("ix_ai_extra_gin", extra_data, postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
     
     # Relationship
-    user = relationship("User", back_populates="ai_recommendations")
\ No newline at end of file
+    user: Mapped["User"] = relationship(back_populates="ai_recommendations", lazy="raise")
+
+# Serve the newest-first /recommendations listings without sorting every row
+# of the user; the partial one covers unread_only. Declared after the class
+# because created_at comes from the mixin
+Index("ix_ai_recs_user_created", AIRecommendation.user_id, AIRecommendation.created_at.desc())
+Index(
+    "ix_ai_recs_user_unread", AIRecommendation.user_id, AIRecommendation.created_at.desc(),
+    postgresql_where=text("NOT is_read"),
+    sqlite_where=text("is_read = 0")
+)
@@ -0,0 +1,17 @@
+# redis_client.py
+import os
+import logging
+from dotenv import load_dotenv
+import redis.asyncio as redis
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Redis is optional: without REDIS_URL, callers fall back to in-process state
+REDIS_URL = os.getenv("REDIS_URL")
+
+redis_client = redis.from_url(REDIS_URL, decode_responses=True) if REDIS_URL else None
+
+if redis_client is None:
+    logger.info("REDIS_URL not set, using in-process fallbacks")
@@ -1,12 +1,15 @@
 # routes.py - Fixed version without auto check-in
 # routes.py - Remove all cookie references
-from fastapi import APIRouter, HTTPException, Request, status, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+import asyncio
+import hashlib
+from collections import defaultdict
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status, Depends, BackgroundTasks
 from datetime import datetime, timedelta
 from typing import List, Optional
+from pydantic import TypeAdapter
 import secrets
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc, or_
+from sqlalchemy import select, exists, and_, func, desc, or_, lambda_stmt, Date
 from sqlalchemy.orm import selectinload
 
 from auth_utils import (
@@ -20,13 +23,16 @@ from auth_utils import (
     verify_admin_creation_secret,
     rate_limit_admin_operations,
     verify_admin_invite_token,
-    create_first_admin_if_none_exist
+    create_first_admin_if_none_exist,
+    invalidate_cached_token
 )
-from database import get_db
+from database import get_db, dialect_insert, AsyncSessionLocal
 from model import User, Habit, HabitCheckIn, UserBadge, AIRecommendation, AdminInvite
 from schema import (
     UserSignup, 
     UserLogin, 
+    LoginResponse,
+    LoginUserResponse,
     UserCreateWithRole,
     HabitCreate,
     HabitResponse,
@@ -37,14 +43,26 @@ from schema import (
     BadgeResponse,
     AIRecommendationResponse,
     UserStatsResponse,
+    DailyProgressResponse,
+    WeeklyProgressResponse,
+    AdminAnalyticsResponse,
     RecommendationRequest,
     CreateFirstAdminRequest,
     AdminInviteRequest,
     AdminInviteAccept,
-    AdminInviteResponse
+    AdminInviteResponse,
+    AdminInviteSummaryResponse
 )
 from ai_service import AIRecommendationService
-from gamification_service import GamificationService
+from cache import cache_add, cache_get, cache_set
+from gamification_service import (
+    GamificationService,
+    USER_STATS_TTL_SECONDS,
+    USER_BADGES_TTL_SECONDS,
+    user_stats_key,
+    user_badges_key,
+    run_in_new_session
+)
 import logging
 
 router = APIRouter()
@@ -55,6 +73,52 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Admin lists return every row unless ?limit= asks for a page; pages are
+# keyset-paginated by id, and X-Next-Cursor carries the ?cursor= of the next
+ADMIN_MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# Per-user responses are revalidated on every request and answered with 304
+# when the ETag still matches; they vary by the bearer token, so a browser
+# never serves one account's cached body to another
+REVALIDATE_CACHE_CONTROL = "private, no-cache"
+
+def _etag(*parts) -> str:
+    """ETag over the values that determine a response body, user id included"""
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+def _revalidation_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": REVALIDATE_CACHE_CONTROL, "Vary": "Authorization"}
+
+def _client_has(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names `etag`"""
+    if_none_match = request.headers.get("if-none-match", "")
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Return a 304 if the client already holds `etag`, else tag `response` with it"""
+    headers = _revalidation_headers(etag)
+    if _client_has(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+_badge_list_adapter = TypeAdapter(List[BadgeResponse])
+
+def _revalidated_json_response(request: Request, user_id: int, payload: str) -> Response:
+    """Send a payload already serialized by its response model, or a 304 if the client holds it"""
+    headers = _revalidation_headers(_etag(user_id, payload))
+    if _client_has(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+DAILY_RECOMMENDATIONS_FLAG_TTL_SECONDS = 24 * 60 * 60
+
+def daily_recommendations_key(user_id: int, day) -> str:
+    """Cache key flagging that the user's daily recommendation check ran on `day`"""
+    return f"user:{user_id}:daily_recs:{day.isoformat()}"
+
 # -------------------------------
 # Auth Routes
 # -------------------------------
@@ -62,16 +126,15 @@ logger = logging.getLogger(__name__)
 @router.post("/signup", response_model=MessageResponse)
 async def signup(user: UserSignup, db: AsyncSession = Depends(get_db)):
     # Check if user already exists
-    result = await db.execute(select(User).where(User.email == user.email))
-    existing_user = result.scalar_one_or_none()
+    existing_user = await db.scalar(select(exists().where(User.email == user["email"])))
     
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await hash_password(user["password"])
     new_user = User(
-        email=user.email,
+        email=user["email"],
         hashed_password=hashed_pw
     )
     
@@ -91,7 +154,7 @@ async def create_first_admin(
     
     # Rate limiting
     client_ip = req.client.host
-    if not rate_limit_admin_operations(client_ip, max_attempts=3):
+    if not await rate_limit_admin_operations(client_ip, max_attempts=3):
         raise HTTPException(
             status_code=429,
             detail="Too many admin creation attempts. Try again later."
@@ -113,13 +176,16 @@ async def create_first_admin(
     
     return MessageResponse(message="Super admin created successfully")
 
-@router.post("/login")
+@router.post("/login", response_model=LoginResponse)
 async def login(user: UserLogin, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(User).where(User.email == user.email))
+    # Hot lookups use lambda_stmt: the statement is built and cache-keyed once
+    # per call site, and only the closure values bind on each request
+    email = user["email"]
+    result = await db.execute(lambda_stmt(lambda: select(User).where(User.email == email)))
     db_user = result.scalar_one_or_none()
 
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
-        logger.warning(f"Failed login attempt for email: {user.email}")
+    if not db_user or not await verify_password(user["password"], db_user.hashed_password):
+        logger.warning(f"Failed login attempt for email: {email}")
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     logger.info(f"✅ LOGIN SUCCESS - User: {db_user.email} | Role: {db_user.role}")
@@ -128,27 +194,30 @@ async def login(user: UserLogin, background_tasks: BackgroundTasks, db: AsyncSes
         logger.warning(f"🔐 ADMIN LOGIN - {db_user.role.upper()}: {db_user.email}")
     
     token = create_access_token(
-        data={"sub": user.email}, 
+        data={"sub": email}, 
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
-    background_tasks.add_task(check_daily_recommendations, db_user.id, db)
+    background_tasks.add_task(check_daily_recommendations, db_user.id)
     
     # Return token in response body for localStorage storage
-    return {
-        "message": "Login successful",
-        "access_token": token,
-        "token_type": "bearer",
-        "user": {
-            "email": db_user.email,
-            "role": db_user.role,
-            "is_admin": db_user.role in ["admin", "super_admin"]
-        }
-    }
+    return LoginResponse(
+        message="Login successful",
+        access_token=token,
+        token_type="bearer",
+        user=LoginUserResponse(
+            email=db_user.email,
+            role=db_user.role,
+            is_admin=db_user.role in ["admin", "super_admin"]
+        )
+    )
 
 @router.post("/logout", response_model=MessageResponse)
-async def logout():
+async def logout(request: Request):
     """Logout - client should remove token from localStorage"""
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        invalidate_cached_token(auth_header.replace("Bearer ", "").strip())
     return MessageResponse(message="Logged out successfully")
 
 # ... (rest of your routes remain exactly the same, they already use get_current_user which uses Authorization header)
@@ -158,37 +227,39 @@ async def logout():
 # -------------------------------
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        role=current_user.role,
-        total_points=current_user.total_points,
-        level=current_user.level,
-        created_at=current_user.created_at
-    )
+async def get_me(request: Request, current_user: User = Depends(get_current_user)):
+    payload = UserResponse.from_orm_fast(current_user).model_dump_json()
+    return _revalidated_json_response(request, current_user.id, payload)
 
 # -------------------------------
 # Background Tasks
 # -------------------------------
 
-async def check_daily_recommendations(user_id: int, db: AsyncSession):
+async def check_daily_recommendations(user_id: int):
     """Background task to generate daily recommendations if needed"""
     today = datetime.utcnow().date()
     
-    # Check if user already has recommendations for today
-    result = await db.execute(
-        select(AIRecommendation)
-        .where(and_(
-            AIRecommendation.user_id == user_id,
-            func.date(AIRecommendation.created_at) == today
-        ))
-    )
-    existing = result.scalars().first()
-    
-    if not existing:
-        # Generate motivation recommendation
-        await ai_service.generate_recommendation(user_id, "motivation", db)
+    # Only the first login of the day does any work; later ones stop at the flag
+    if not await cache_add(daily_recommendations_key(user_id, today), "1", DAILY_RECOMMENDATIONS_FLAG_TTL_SECONDS):
+        return
+    
+    today_start = datetime.combine(today, datetime.min.time())
+    
+    # The request session is closed by the time background tasks run
+    async with AsyncSessionLocal() as db:
+        # Check if user already has recommendations for today; a half-open range
+        # on the bare column keeps (user_id, created_at) index-searchable
+        existing = await db.scalar(
+            select(exists().where(and_(
+                AIRecommendation.user_id == user_id,
+                AIRecommendation.created_at >= today_start,
+                AIRecommendation.created_at < today_start + timedelta(days=1)
+            )))
+        )
+        
+        if not existing:
+            # Generate motivation recommendation
+            await ai_service.generate_recommendation(user_id, "motivation", db)
 
 # -------------------------------
 # Admin Management Routes
@@ -205,7 +276,7 @@ async def invite_admin(
     
     # Rate limiting
     client_ip = req.client.host
-    if not rate_limit_admin_operations(client_ip):
+    if not await rate_limit_admin_operations(client_ip):
         raise HTTPException(
             status_code=429, 
             detail="Too many admin operations. Try again later."
@@ -216,21 +287,19 @@ async def invite_admin(
         raise HTTPException(status_code=403, detail="Invalid admin creation secret")
     
     # Check if user already exists
-    result = await db.execute(select(User).where(User.email == request.email))
-    existing_user = result.scalar_one_or_none()
+    existing_user = await db.scalar(select(exists().where(User.email == request.email)))
     
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Check for existing valid invite
-    result = await db.execute(
-        select(AdminInvite).where(
+    existing_invite = await db.scalar(
+        select(exists().where(
             AdminInvite.email == request.email,
             AdminInvite.is_used == False,
             AdminInvite.expires_at > datetime.utcnow()
-        )
+        ))
     )
-    existing_invite = result.scalar_one_or_none()
     
     if existing_invite:
         raise HTTPException(status_code=400, detail="Valid invitation already exists")
@@ -265,26 +334,25 @@ async def accept_admin_invite(
     
     # Rate limiting
     client_ip = req.client.host
-    if not rate_limit_admin_operations(client_ip):
+    if not await rate_limit_admin_operations(client_ip):
         raise HTTPException(
             status_code=429,
             detail="Too many admin operations. Try again later."
         )
     
     # Verify invite token
-    invite = await verify_admin_invite_token(request.invite_token, db)
+    invite = await verify_admin_invite_token(request["invite_token"], db)
     if not invite:
         raise HTTPException(status_code=400, detail="Invalid or expired invitation")
     
     # Check if user already exists
-    result = await db.execute(select(User).where(User.email == invite.email))
-    existing_user = result.scalar_one_or_none()
+    existing_user = await db.scalar(select(exists().where(User.email == invite.email)))
     
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
     # Create admin user
-    hashed_password = hash_password(request.password)
+    hashed_password = await hash_password(request["password"])
     new_admin = User(
         email=invite.email,
         hashed_password=hashed_password,
@@ -301,29 +369,34 @@ async def accept_admin_invite(
     
     return MessageResponse(message=f"Admin account created successfully for {invite.email}")
 
-@router.get("/admin/invites")
+@router.get("/admin/invites", response_model=List[AdminInviteSummaryResponse])
 async def list_admin_invites(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_super_admin)
 ):
-    """List all admin invitations (super admin only)"""
-    
-    result = await db.execute(
-        select(AdminInvite)
-        .order_by(AdminInvite.created_at.desc())
+    """List admin invitations newest first, optionally one page at a time (super admin only)"""
+    query = select(
+        AdminInvite.id,
+        AdminInvite.email,
+        AdminInvite.is_used,
+        AdminInvite.expires_at,
+        AdminInvite.created_at,
+        AdminInvite.used_at
     )
-    invites = result.scalars().all()
+    if cursor is not None:
+        query = query.where(AdminInvite.id < cursor)
+    
+    result = await db.execute(query.order_by(AdminInvite.id.desc()).limit(limit))
+    invites = result.all()
     
-    return [{
-        "id": invite.id,
-        "email": invite.email,
-        "is_used": invite.is_used,
-        "expires_at": invite.expires_at,
-        "created_at": invite.created_at,
-        "used_at": invite.used_at
-    } for invite in invites]
+    if limit is not None and len(invites) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(invites[-1].id)
+    return [AdminInviteSummaryResponse.from_orm_fast(invite) for invite in invites]
 
-@router.delete("/admin/invites/{invite_id}")
+@router.delete("/admin/invites/{invite_id}", response_model=MessageResponse)
 async def revoke_admin_invite(
     invite_id: int,
     db: AsyncSession = Depends(get_db),
@@ -368,66 +441,102 @@ async def create_habit(
         start_date=datetime.utcnow()
     )
     
+    # Server-side defaults come back with the INSERT (eager_defaults), so no refresh
     db.add(new_habit)
     await db.commit()
-    await db.refresh(new_habit)
+    ai_service.invalidate_user_analytics(current_user.id)
+    await GamificationService.invalidate_user_stats(current_user.id)
     
-    # Check for badges after creating habit
-    await GamificationService.check_and_award_badges(current_user.id, db)
-    
-    # Load check-ins to calculate streak
-    result = await db.execute(
-        select(Habit)
-        .options(selectinload(Habit.check_ins))
-        .where(Habit.id == new_habit.id)
-    )
-    habit_with_checkins = result.scalar_one()
+    # Check for badges after creating habit, on the next badge worker pass
+    GamificationService.queue_badge_check(current_user.id)
     
+    # A brand-new habit has no check-ins, so there is nothing to reload
     return HabitResponse(
-        id=habit_with_checkins.id,
-        name=habit_with_checkins.name,
-        description=habit_with_checkins.description,
-        category=habit_with_checkins.category,
-        difficulty_level=habit_with_checkins.difficulty_level,
-        start_date=habit_with_checkins.start_date,
-        current_streak=len(habit_with_checkins.check_ins),
-        points_per_completion=habit_with_checkins.points_per_completion,
-        check_ins=[HabitCheckInResponse(id=ci.id, check_in_date=ci.check_in_date, points_earned=ci.points_earned) 
-                  for ci in habit_with_checkins.check_ins]
+        id=new_habit.id,
+        name=new_habit.name,
+        description=new_habit.description,
+        category=new_habit.category,
+        difficulty_level=new_habit.difficulty_level,
+        start_date=new_habit.start_date,
+        current_streak=0,
+        points_per_completion=new_habit.points_per_completion,
+        check_ins=[]
     )
 
 @router.get("/habits", response_model=List[HabitResponse])
 async def get_habits(
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    result = await db.execute(
-        select(Habit)
-        .options(selectinload(Habit.check_ins))
-        .where(Habit.user_id == current_user.id)
+    user_id = current_user.id
+    
+    # Habits and check-ins only ever grow or get updated, so counts plus the
+    # newest change identify the data; the date because streaks roll over
+    version = await db.execute(
+        select(
+            select(func.count(Habit.id)).where(Habit.user_id == user_id).scalar_subquery(),
+            select(func.max(Habit.updated_at)).where(Habit.user_id == user_id).scalar_subquery(),
+            select(func.count(HabitCheckIn.id))
+            .join(Habit).where(Habit.user_id == user_id).scalar_subquery(),
+            select(func.max(HabitCheckIn.id))
+            .join(Habit).where(Habit.user_id == user_id).scalar_subquery()
+        )
     )
-    habits = result.scalars().all()
+    not_modified = _not_modified(request, response, _etag(user_id, *version.one(), datetime.utcnow().date()))
+    if not_modified is not None:
+        return not_modified
+    
+    # Plain rows rather than ORM entities, both on the request's own
+    # connection so one request never holds more than one pooled connection
+    habits_result = await db.execute(lambda_stmt(
+        lambda: select(
+            Habit.id,
+            Habit.name,
+            Habit.description,
+            Habit.category,
+            Habit.difficulty_level,
+            Habit.start_date,
+            Habit.points_per_completion
+        )
+        .where(Habit.user_id == user_id)
+    ))
+    habits = habits_result.all()
+    
+    check_ins_result = await db.execute(lambda_stmt(
+        lambda: select(
+            HabitCheckIn.habit_id,
+            HabitCheckIn.id,
+            HabitCheckIn.check_in_date,
+            HabitCheckIn.points_earned,
+            HabitCheckIn.mood_rating,
+            HabitCheckIn.notes
+        )
+        .join(Habit)
+        .where(Habit.user_id == user_id)
+        .order_by(HabitCheckIn.check_in_date.desc())
+    ))
+    check_in_rows = check_ins_result.all()
+    
+    check_ins_by_habit = defaultdict(list)
+    for check_in in check_in_rows:
+        check_ins_by_habit[check_in.habit_id].append(check_in)
     
     habit_responses = []
+    today = datetime.utcnow().toordinal()
     for habit in habits:
+        check_ins = check_ins_by_habit.get(habit.id, [])
+        
         # Calculate current streak
-        streak = GamificationService._calculate_streak(habit.check_ins)
+        streak = GamificationService._calculate_streak(check_ins, today)
         
-        habit_responses.append(HabitResponse(
-            id=habit.id,
-            name=habit.name,
-            description=habit.description,
-            category=habit.category,
-            difficulty_level=habit.difficulty_level,
-            start_date=habit.start_date,
+        # Rows come straight from the DB, so skip per-field validation of
+        # every habit and check-in
+        habit_responses.append(HabitResponse.from_orm_fast(
+            habit,
             current_streak=streak,
-            points_per_completion=habit.points_per_completion,
-            check_ins=[HabitCheckInResponse(
-                id=ci.id, 
-                check_in_date=ci.check_in_date,
-                points_earned=ci.points_earned,
-                mood_rating=ci.mood_rating
-            ) for ci in habit.check_ins]
+            check_ins=[HabitCheckInResponse.from_orm_fast(ci) for ci in check_ins]
         ))
     
     return habit_responses
@@ -435,78 +544,81 @@ async def get_habits(
 @router.post("/check-in/{habit_id}", response_model=HabitResponse)
 async def mark_habit_as_done(
     habit_id: int, 
+    background_tasks: BackgroundTasks,
     mood_rating: Optional[int] = None,
     notes: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Ensure user owns the habit
-    result = await db.execute(
-        select(Habit)
+    user_id = current_user.id
+    result = await db.execute(lambda_stmt(
+        lambda: select(Habit)
         .options(selectinload(Habit.check_ins))
-        .where(and_(Habit.id == habit_id, Habit.user_id == current_user.id))
-    )
+        .where(and_(Habit.id == habit_id, Habit.user_id == user_id))
+    ))
     habit = result.scalar_one_or_none()
     
     if not habit:
         raise HTTPException(status_code=404, detail="Habit not found")
 
-    today = datetime.utcnow().date()
+    now = datetime.utcnow()
+    today = now.date()
+    
+    # Calculate bonus points for streak
+    current_streak = GamificationService._calculate_streak(habit.check_ins, today.toordinal())
+    streak_bonus = min(current_streak // 7, 5) * 5  # 5 bonus points per week in streak, max 25
+    points_earned = habit.points_per_completion + streak_bonus
     
-    # Check if already checked in today
-    already_checked_in = any(
-        ci.check_in_date.date() == today for ci in habit.check_ins
+    # The one-check-in-per-day unique index rejects a second check-in today,
+    # so no separate "already checked in" lookup is needed
+    result = await db.execute(
+        dialect_insert(db)(HabitCheckIn)
+        .values(
+            habit_id=habit.id,
+            check_in_date=now,
+            mood_rating=mood_rating,
+            notes=notes,
+            points_earned=points_earned
+        )
+        .on_conflict_do_nothing(
+            index_elements=[HabitCheckIn.habit_id, func.date(HabitCheckIn.check_in_date)]
+        )
+        .returning(HabitCheckIn.id)
     )
     
-    if already_checked_in:
+    check_in_id = result.scalar_one_or_none()
+    if check_in_id is None:
         raise HTTPException(
             status_code=400, 
             detail="Already checked in today for this habit"
         )
     
-    # Calculate bonus points for streak
-    current_streak = GamificationService._calculate_streak(habit.check_ins)
-    streak_bonus = min(current_streak // 7, 5) * 5  # 5 bonus points per week in streak, max 25
-    points_earned = habit.points_per_completion + streak_bonus
+    await db.commit()
+    ai_service.invalidate_user_analytics(current_user.id)
+    await GamificationService.invalidate_user_stats(current_user.id)
     
-    new_checkin = HabitCheckIn(
-        habit_id=habit.id,
-        check_in_date=datetime.utcnow(),
+    # Award points once the response is sent; badges on the next badge worker pass
+    background_tasks.add_task(GamificationService.award_points_in_background, current_user.id, points_earned)
+    GamificationService.queue_badge_check(current_user.id)
+
+    # Build the response from the check-ins already loaded plus the new one
+    # instead of reloading the whole history: today's check-in extends the
+    # run of consecutive days ending yesterday
+    streak = GamificationService._calculate_streak(habit.check_ins, today.toordinal() - 1) + 1
+    new_check_in = HabitCheckInResponse.model_construct(
+        id=check_in_id,
+        check_in_date=now,
+        points_earned=points_earned,
         mood_rating=mood_rating,
-        notes=notes,
-        points_earned=points_earned
+        notes=notes
     )
-    db.add(new_checkin)
-    
-    # Award points to user
-    await GamificationService.award_points(current_user.id, points_earned, db)
-    
-    # Check for new badges
-    new_badges = await GamificationService.check_and_award_badges(current_user.id, db)
-    
-    await db.commit()
-    await db.refresh(new_checkin)
-    await db.refresh(habit)
-
-    # Calculate current streak for response
-    streak = GamificationService._calculate_streak(habit.check_ins)
 
     # Return updated habit
-    return HabitResponse(
-        id=habit.id,
-        name=habit.name,
-        description=habit.description,
-        category=habit.category,
-        difficulty_level=habit.difficulty_level,
-        start_date=habit.start_date,
+    return HabitResponse.from_orm_fast(
+        habit,
         current_streak=streak,
-        points_per_completion=habit.points_per_completion,
-        check_ins=[HabitCheckInResponse(
-            id=ci.id, 
-            check_in_date=ci.check_in_date,
-            points_earned=ci.points_earned,
-            mood_rating=ci.mood_rating
-        ) for ci in habit.check_ins]
+        check_ins=[HabitCheckInResponse.from_orm_fast(ci) for ci in habit.check_ins] + [new_check_in]
     )
 
 # -------------------------------
@@ -515,71 +627,71 @@ async def mark_habit_as_done(
 
 @router.get("/stats", response_model=UserStatsResponse)
 async def get_user_stats(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get user badges
-    badges_result = await db.execute(
-        select(UserBadge)
+    cache_key = user_stats_key(current_user.id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return _revalidated_json_response(request, current_user.id, cached)
+    
+    # Newest 5 badges; the window count still sees every badge before LIMIT applies
+    result = await db.execute(
+        select(UserBadge, func.count().over().label("badges_count"))
         .where(UserBadge.user_id == current_user.id)
         .order_by(desc(UserBadge.earned_at))
+        .limit(5)
     )
-    badges = badges_result.scalars().all()
+    badge_rows = result.all()
     
-    # Get habits with streaks
-    habits_result = await db.execute(
-        select(Habit)
-        .options(selectinload(Habit.check_ins))
-        .where(and_(Habit.user_id == current_user.id, Habit.is_active == True))
-    )
-    habits = habits_result.scalars().all()
+    # Streaks come straight from SQL rather than loading each habit's check-ins;
+    # both queries share the request session, so it holds one pooled connection
+    active_streaks = await GamificationService.get_active_streaks(current_user.id, db)
+    badges_count = badge_rows[0].badges_count if badge_rows else 0
     
-    active_streaks = []
-    for habit in habits:
-        streak = GamificationService._calculate_streak(habit.check_ins)
-        active_streaks.append(streak)
-    
-    # Get recent badges (last 5)
-    recent_badges = [
-        BadgeResponse(
-            id=badge.id,
-            badge_type=badge.badge_type,
-            badge_name=badge.badge_name,
-            badge_description=badge.badge_description,
-            earned_at=badge.earned_at
-        ) for badge in badges[:5]
-    ]
-    
-    return UserStatsResponse(
+    # Get recent badges (last 5); every value is already typed by SQL, so
+    # the response is built without re-validating each badge and streak
+    recent_badges = [BadgeResponse.from_orm_fast(badge) for badge, _ in badge_rows]
+    
+    stats = UserStatsResponse.model_construct(
         total_points=current_user.total_points,
         level=current_user.level,
-        total_habits=len(habits),
+        total_habits=len(active_streaks),
         active_streaks=active_streaks,
-        badges_count=len(badges),
+        badges_count=badges_count,
         recent_badges=recent_badges
     )
+    payload = stats.model_dump_json()
+    await cache_set(cache_key, payload, USER_STATS_TTL_SECONDS)
+    return _revalidated_json_response(request, current_user.id, payload)
 
 @router.get("/badges", response_model=List[BadgeResponse])
 async def get_user_badges(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    cache_key = user_badges_key(current_user.id)
+    cached = await cache_get(cache_key)
+    if cached is not None:
+        return _revalidated_json_response(request, current_user.id, cached)
+    
     result = await db.execute(
-        select(UserBadge)
+        select(
+            UserBadge.id,
+            UserBadge.badge_type,
+            UserBadge.badge_name,
+            UserBadge.badge_description,
+            UserBadge.earned_at
+        )
         .where(UserBadge.user_id == current_user.id)
         .order_by(desc(UserBadge.earned_at))
     )
-    badges = result.scalars().all()
-    
-    return [
-        BadgeResponse(
-            id=badge.id,
-            badge_type=badge.badge_type,
-            badge_name=badge.badge_name,
-            badge_description=badge.badge_description,
-            earned_at=badge.earned_at
-        ) for badge in badges
-    ]
+    badge_responses = [BadgeResponse.from_orm_fast(row) for row in result.all()]
+    payload = _badge_list_adapter.dump_json(badge_responses).decode()
+    await cache_set(cache_key, payload, USER_BADGES_TTL_SECONDS)
+    return _revalidated_json_response(request, current_user.id, payload)
 
 # -------------------------------
 # AI Recommendation Routes
@@ -601,57 +713,68 @@ async def generate_recommendation(
     if not recommendation:
         raise HTTPException(status_code=500, detail="Failed to generate recommendation")
     
-    return AIRecommendationResponse(
-        id=recommendation.id,
-        recommendation_type=recommendation.recommendation_type,
-        title=recommendation.title,
-        content=recommendation.content,
-        priority=recommendation.priority,
-        is_read=recommendation.is_read,
-        source_ai=recommendation.source_ai,
-        created_at=recommendation.created_at
-    )
+    return AIRecommendationResponse.from_orm_fast(recommendation)
 
 @router.get("/recommendations", response_model=List[AIRecommendationResponse])
 async def get_recommendations(
+    request: Request,
+    response: Response,
     limit: int = 10,
     unread_only: bool = False,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get user's AI recommendations"""
-    query = select(AIRecommendation).where(AIRecommendation.user_id == current_user.id)
+    user_id = current_user.id
+    now = datetime.utcnow()
+    
+    # Version of the listing: rows are only added, marked read or expire
+    version_query = select(
+        func.count(AIRecommendation.id),
+        func.max(AIRecommendation.id),
+        func.count(AIRecommendation.id).filter(AIRecommendation.is_read == True)
+    ).where(
+        AIRecommendation.user_id == user_id,
+        or_(
+            AIRecommendation.expires_at.is_(None),
+            AIRecommendation.expires_at > now
+        )
+    )
+    if unread_only:
+        version_query = version_query.where(AIRecommendation.is_read == False)
+    version = await db.execute(version_query)
+    not_modified = _not_modified(request, response, _etag(user_id, *version.one(), limit, unread_only))
+    if not_modified is not None:
+        return not_modified
+    query = lambda_stmt(lambda: select(
+        AIRecommendation.id,
+        AIRecommendation.recommendation_type,
+        AIRecommendation.title,
+        AIRecommendation.content,
+        AIRecommendation.priority,
+        AIRecommendation.is_read,
+        AIRecommendation.source_ai,
+        AIRecommendation.created_at
+    ).where(AIRecommendation.user_id == user_id))
     
     if unread_only:
-        query = query.where(AIRecommendation.is_read == False)
+        query += lambda s: s.where(AIRecommendation.is_read == False)
     
     # Only get non-expired recommendations
-    query = query.where(
+    query += lambda s: s.where(
         or_(
             AIRecommendation.expires_at.is_(None),
-            AIRecommendation.expires_at > datetime.utcnow()
+            AIRecommendation.expires_at > now
         )
     )
     
-    query = query.order_by(desc(AIRecommendation.created_at)).limit(limit)
+    query += lambda s: s.order_by(desc(AIRecommendation.created_at)).limit(limit)
     
     result = await db.execute(query)
-    recommendations = result.scalars().all()
-    
-    return [
-        AIRecommendationResponse(
-            id=rec.id,
-            recommendation_type=rec.recommendation_type,
-            title=rec.title,
-            content=rec.content,
-            priority=rec.priority,
-            is_read=rec.is_read,
-            source_ai=rec.source_ai,
-            created_at=rec.created_at
-        ) for rec in recommendations
-    ]
-
-@router.patch("/recommendations/{recommendation_id}/read")
+    
+    return [AIRecommendationResponse.from_orm_fast(row) for row in result.all()]
+
+@router.patch("/recommendations/{recommendation_id}/read", response_model=MessageResponse)
 async def mark_recommendation_as_read(
     recommendation_id: int,
     db: AsyncSession = Depends(get_db),
@@ -673,51 +796,50 @@ async def mark_recommendation_as_read(
     recommendation.is_read = True
     await db.commit()
     
-    return {"message": "Recommendation marked as read"}
+    return MessageResponse(message="Recommendation marked as read")
 
-@router.get("/recommendations/daily")
+@router.get("/recommendations/daily", response_model=List[AIRecommendationResponse])
 async def get_daily_recommendations(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Get today's personalized recommendations"""
-    today = datetime.utcnow().date()
+    today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
     
     # Check if we already have recommendations for today
     result = await db.execute(
         select(AIRecommendation)
         .where(and_(
             AIRecommendation.user_id == current_user.id,
-            func.date(AIRecommendation.created_at) == today
+            AIRecommendation.created_at >= today_start,
+            AIRecommendation.created_at < today_start + timedelta(days=1)
         ))
     )
     existing_recommendations = result.scalars().all()
     
     if not existing_recommendations:
-        # Generate daily recommendations
-        motivation = await ai_service.generate_recommendation(
-            current_user.id, "motivation", db
-        )
-        improvement = await ai_service.generate_recommendation(
-            current_user.id, "improvement", db
+        # Warm the analytics cache once so both generations below reuse it
+        await ai_service.get_user_analytics(current_user.id, db)
+        
+        # Generate daily recommendations concurrently; each LLM call takes
+        # seconds, and each generation writes through its own session. End
+        # the request session's transaction first so its connection goes back
+        # to the pool instead of being held while the others check one out
+        await db.commit()
+        motivation, improvement = await asyncio.gather(
+            run_in_new_session(
+                lambda session: ai_service.generate_recommendation(current_user.id, "motivation", session)
+            ),
+            run_in_new_session(
+                lambda session: ai_service.generate_recommendation(current_user.id, "improvement", session)
+            )
         )
         
         recommendations = [r for r in [motivation, improvement] if r]
     else:
         recommendations = existing_recommendations
     
-    return [
-        AIRecommendationResponse(
-            id=rec.id,
-            recommendation_type=rec.recommendation_type,
-            title=rec.title,
-            content=rec.content,
-            priority=rec.priority,
-            is_read=rec.is_read,
-            source_ai=rec.source_ai,
-            created_at=rec.created_at
-        ) for rec in recommendations
-    ]
+    return [AIRecommendationResponse.from_orm_fast(rec) for rec in recommendations]
 
 # -------------------------------
 # Progress Routes
@@ -728,7 +850,7 @@ async def get_progress(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    today = datetime.utcnow().date()
+    today_start = datetime.combine(datetime.utcnow().date(), datetime.min.time())
     
     # Get total habits count
     total_habits_result = await db.execute(
@@ -748,21 +870,23 @@ async def get_progress(
             and_(
                 Habit.user_id == current_user.id,
                 Habit.is_active == True,
-                func.date(HabitCheckIn.check_in_date) == today
+                HabitCheckIn.check_in_date >= today_start,
+                HabitCheckIn.check_in_date < today_start + timedelta(days=1)
             )
         )
     )
     completed_today = completed_today_result.scalar() or 0
     
-    return ProgressResponse(
+    # Built from trusted counts, so skip validation
+    return ProgressResponse.model_construct(
         completedToday=completed_today,
         totalHabits=total_habits,
-        completionRate=(completed_today / total_habits * 100) if total_habits > 0 else 0,
+        completionRate=(completed_today / total_habits * 100) if total_habits > 0 else 0.0,
         currentLevel=current_user.level,
         totalPoints=current_user.total_points
     )
 
-@router.get("/progress/weekly")
+@router.get("/progress/weekly", response_model=WeeklyProgressResponse)
 async def get_weekly_progress(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -770,52 +894,85 @@ async def get_weekly_progress(
     """Get weekly progress statistics"""
     today = datetime.utcnow().date()
     week_start = today - timedelta(days=today.weekday())
+    week_days = [week_start + timedelta(days=i) for i in range(7)]
+    
+    # Two grouped queries for the whole week, one after another on the
+    # request session so the request holds a single pooled connection
+    
+    # Active habits grouped by start day; a habit counts towards every day from its start
+    start_day = func.date(Habit.start_date, type_=Date)
+    result = await db.execute(
+        select(start_day, func.count(Habit.id))
+        .where(and_(
+            Habit.user_id == current_user.id,
+            Habit.is_active == True,
+            start_day <= week_days[-1]
+        ))
+        .group_by(start_day)
+    )
+    started = result.all()
+    
+    # Distinct habits checked in on each day of the week
+    checkin_day = func.date(HabitCheckIn.check_in_date, type_=Date)
+    result = await db.execute(
+        select(checkin_day, func.count(func.distinct(Habit.id)))
+        .select_from(Habit)
+        .join(HabitCheckIn)
+        .where(and_(
+            Habit.user_id == current_user.id,
+            Habit.is_active == True,
+            HabitCheckIn.check_in_date >= datetime.combine(week_start, datetime.min.time()),
+            HabitCheckIn.check_in_date < datetime.combine(week_start + timedelta(days=7), datetime.min.time())
+        ))
+        .group_by(checkin_day)
+    )
+    completed_by_day = dict(result.all())
     
     daily_progress = []
-    for i in range(7):
-        day = week_start + timedelta(days=i)
+    for day in week_days:
+        total_habits = sum(count for start_day, count in started if start_day <= day)
+        completed = completed_by_day.get(day, 0)
         
-        # Get total habits for this day
-        total_habits_result = await db.execute(
-            select(func.count(Habit.id)).where(and_(
-                Habit.user_id == current_user.id,
-                Habit.is_active == True,
-                func.date(Habit.start_date) <= day
-            ))
-        )
-        total_habits = total_habits_result.scalar()
-        
-        # Get completed habits for this day
-        completed_result = await db.execute(
-            select(func.count(func.distinct(Habit.id)))
-            .select_from(Habit)
-            .join(HabitCheckIn)
-            .where(and_(
-                Habit.user_id == current_user.id,
-                Habit.is_active == True,
-                func.date(HabitCheckIn.check_in_date) == day
-            ))
-        )
-        completed = completed_result.scalar() or 0
-        
-        daily_progress.append({
-            "date": day.isoformat(),
-            "completed": completed,
-            "total": total_habits,
-            "completion_rate": (completed / total_habits * 100) if total_habits > 0 else 0
-        })
+        daily_progress.append(DailyProgressResponse.model_construct(
+            date=day.isoformat(),
+            completed=completed,
+            total=total_habits,
+            completion_rate=(completed / total_habits * 100) if total_habits > 0 else 0.0
+        ))
     
-    return {"weekly_progress": daily_progress}
+    return WeeklyProgressResponse.model_construct(weekly_progress=daily_progress)
 
 # -------------------------------
 # Admin Routes
 # -------------------------------
 
 @router.get("/admin/users", response_model=List[UserResponse])
-async def get_users(db: AsyncSession = Depends(get_db), _: User = Depends(get_current_admin)):
-    result = await db.execute(select(User))
-    users = result.scalars().all()
-    return users
+async def get_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=ADMIN_MAX_PAGE_SIZE),
+    cursor: Optional[int] = None,
+    role: Optional[str] = Query(None, pattern="^(user|admin|super_admin)$"),
+    email: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _: User = Depends(get_current_admin)
+):
+    """List users by id, optionally one page at a time and filtered by role or email prefix"""
+    query = select(
+        User.id, User.email, User.role, User.total_points, User.level, User.created_at
+    )
+    if cursor is not None:
+        query = query.where(User.id > cursor)
+    if role is not None:
+        query = query.where(User.role == role)
+    if email:
+        query = query.where(User.email.startswith(email, autoescape=True))
+    
+    result = await db.execute(query.order_by(User.id).limit(limit))
+    users = result.all()
+    
+    if limit is not None and len(users) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = str(users[-1].id)
+    return [UserResponse.from_orm_fast(user) for user in users]
 
 @router.post("/admin/users", response_model=MessageResponse)
 async def create_user(
@@ -824,18 +981,17 @@ async def create_user(
     _: User = Depends(get_current_admin)
 ):
     # Check if user already exists
-    result = await db.execute(select(User).where(User.email == user.email))
-    existing_user = result.scalar_one_or_none()
+    existing_user = await db.scalar(select(exists().where(User.email == user["email"])))
     
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
     # Create new user
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await hash_password(user["password"])
     new_user = User(
-        email=user.email,
+        email=user["email"],
         hashed_password=hashed_pw,
-        role=user.role
+        role=user.get("role", "user")
     )
     
     db.add(new_user)
@@ -844,76 +1000,73 @@ async def create_user(
     
     return MessageResponse(message="User created successfully")
 
-@router.get("/admin/analytics")
+@router.get("/admin/analytics", response_model=AdminAnalyticsResponse)
 async def get_admin_analytics(
     db: AsyncSession = Depends(get_db),
     _: User = Depends(get_current_admin)
 ):
     """Get platform-wide analytics for admins"""
-    
-    # Total users
-    total_users_result = await db.execute(select(func.count(User.id)))
-    total_users = total_users_result.scalar()
-    
-    # Total habits
-    total_habits_result = await db.execute(select(func.count(Habit.id)))
-    total_habits = total_habits_result.scalar()
-    
-    # Total check-ins
-    total_checkins_result = await db.execute(select(func.count(HabitCheckIn.id)))
-    total_checkins = total_checkins_result.scalar()
-    
-    # Active users (users with check-ins in last 7 days)
     week_ago = datetime.utcnow() - timedelta(days=7)
-    active_users_result = await db.execute(
-        select(func.count(func.distinct(Habit.user_id)))
-        .select_from(Habit)
-        .join(HabitCheckIn)
-        .where(HabitCheckIn.check_in_date >= week_ago)
-    )
-    active_users = active_users_result.scalar()
     
-    return {
-        "total_users": total_users,
-        "total_habits": total_habits,
-        "total_checkins": total_checkins,
-        "active_users_last_7_days": active_users,
-        "average_habits_per_user": total_habits / total_users if total_users > 0 else 0
-    }
+    # Every total as a scalar subquery of one SELECT: a single round-trip
+    result = await db.execute(
+        select(
+            select(func.count(User.id)).scalar_subquery().label("total_users"),
+            select(func.count(Habit.id)).scalar_subquery().label("total_habits"),
+            select(func.count(HabitCheckIn.id)).scalar_subquery().label("total_checkins"),
+            # Active users (users with check-ins in last 7 days)
+            select(func.count(func.distinct(Habit.user_id)))
+            .select_from(Habit)
+            .join(HabitCheckIn)
+            .where(HabitCheckIn.check_in_date >= week_ago)
+            .scalar_subquery().label("active_users")
+        )
+    )
+    total_users, total_habits, total_checkins, active_users = result.one()
+    
+    return AdminAnalyticsResponse.model_construct(
+        total_users=total_users,
+        total_habits=total_habits,
+        total_checkins=total_checkins,
+        active_users_last_7_days=active_users,
+        average_habits_per_user=total_habits / total_users if total_users > 0 else 0.0
+    )
 
 # -------------------------------
 # User Profile Route
 # -------------------------------
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        role=current_user.role,
-        total_points=current_user.total_points,
-        level=current_user.level,
-        created_at=current_user.created_at
-    )
+async def get_me(request: Request, current_user: User = Depends(get_current_user)):
+    payload = UserResponse.from_orm_fast(current_user).model_dump_json()
+    return _revalidated_json_response(request, current_user.id, payload)
 
 # -------------------------------
 # Background Tasks
 # -------------------------------
 
-async def check_daily_recommendations(user_id: int, db: AsyncSession):
+async def check_daily_recommendations(user_id: int):
     """Background task to generate daily recommendations if needed"""
     today = datetime.utcnow().date()
     
-    # Check if user already has recommendations for today
-    result = await db.execute(
-        select(AIRecommendation)
-        .where(and_(
-            AIRecommendation.user_id == user_id,
-            func.date(AIRecommendation.created_at) == today
-        ))
-    )
-    existing = result.scalars().first()
-    
-    if not existing:
-        # Generate motivation recommendation
-        await ai_service.generate_recommendation(user_id, "motivation", db)
\ No newline at end of file
+    # Only the first login of the day does any work; later ones stop at the flag
+    if not await cache_add(daily_recommendations_key(user_id, today), "1", DAILY_RECOMMENDATIONS_FLAG_TTL_SECONDS):
+        return
+    
+    today_start = datetime.combine(today, datetime.min.time())
+    
+    # The request session is closed by the time background tasks run
+    async with AsyncSessionLocal() as db:
+        # Check if user already has recommendations for today; a half-open range
+        # on the bare column keeps (user_id, created_at) index-searchable
+        existing = await db.scalar(
+            select(exists().where(and_(
+                AIRecommendation.user_id == user_id,
+                AIRecommendation.created_at >= today_start,
+                AIRecommendation.created_at < today_start + timedelta(days=1)
+            )))
+        )
+        
+        if not existing:
+            # Generate motivation recommendation
+            await ai_service.generate_recommendation(user_id, "motivation", db)
\ No newline at end of file
@@ -1,23 +1,93 @@
 # schema.py - Complete schema definitions
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict, Any
+import re
+from functools import lru_cache
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, WithJsonSchema, validate_email
+from pydantic_core import PydanticCustomError
+from typing import Annotated, List, Literal, Optional
+from typing_extensions import NotRequired, TypedDict
 from datetime import datetime
 
-# User Schemas
-class UserSignup(BaseModel):
-    email: EmailStr
-    password: str = Field(..., min_length=8)
+# Input with no "@" followed by a dotted domain is rejected by one precompiled
+# regex before reaching email-validator; full results are memoised, since the
+# same few addresses (logins, re-sent signups) are validated over and over
+_EMAIL_RE = re.compile(r"@[^@]*\.")
+
+@lru_cache(maxsize=4096)
+def _normalize_email(value: str) -> str:
+    return validate_email(value)[1]
+
+def _validate_email(value: str) -> str:
+    """Same result and error as EmailStr, with a regex fast path and a cache"""
+    if not _EMAIL_RE.search(value):
+        raise PydanticCustomError(
+            "value_error",
+            "value is not a valid email address: {reason}",
+            {"reason": "An email address must have an @-sign and a domain."}
+        )
+    return _normalize_email(value)
+
+Email = Annotated[
+    str,
+    AfterValidator(_validate_email),
+    WithJsonSchema({"type": "string", "format": "email"})
+]
+
+# Constrained types shared by several schemas, declared once; login rejects
+# passwords over MAX_PASSWORD_LENGTH, so signup must not accept them either
+MAX_PASSWORD_LENGTH = 1024
+Password = Annotated[str, Field(min_length=8, max_length=MAX_PASSWORD_LENGTH)]
+AdminPassword = Annotated[str, Field(min_length=12, max_length=MAX_PASSWORD_LENGTH)]
+HabitName = Annotated[str, Field(min_length=1, max_length=255)]
+Rating = Annotated[int, Field(ge=1, le=5)]
+
+_MISSING = object()
+
+# Response-only schemas are immutable and reject unknown fields
+class ResponseModel(BaseModel):
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
+    @classmethod
+    def from_orm_fast(cls, obj, **values):
+        """Build from a DB row without validation; trusts the column types and constraints"""
+        # Fills the instance the way model_construct does, minus its alias,
+        # extra and private-attribute handling, which response models never use.
+        # Built in declaration order, so the JSON keys keep the schema's order
+        fields = {}
+        for name, field in cls.model_fields.items():
+            value = values.get(name, _MISSING)
+            if value is _MISSING:
+                value = getattr(obj, name, _MISSING)
+            if value is _MISSING:
+                if field.is_required():
+                    # Fail here rather than at serialization, far from the query
+                    raise ValueError(f"{cls.__name__}.from_orm_fast: no value for required field {name!r}")
+                value = field.get_default(call_default_factory=True)
+            fields[name] = value
+        instance = cls.__new__(cls)
+        object.__setattr__(instance, "__dict__", fields)
+        object.__setattr__(instance, "__pydantic_fields_set__", set(fields))
+        object.__setattr__(instance, "__pydantic_extra__", None)
+        object.__setattr__(instance, "__pydantic_private__", None)
+        return instance
 
-class UserLogin(BaseModel):
-    email: EmailStr
+# User Schemas
+# Small flat request bodies are TypedDicts: validated into plain dicts,
+# without building a model instance per request
+class UserSignup(TypedDict):
+    email: Email
+    password: Password
+
+class UserLogin(TypedDict):
+    email: Email
     password: str
 
-class UserCreateWithRole(BaseModel):
-    email: EmailStr
-    password: str = Field(..., min_length=8)
-    role: str = Field(default="user")
+class UserCreateWithRole(TypedDict):
+    email: Email
+    password: Password
+    # Defaults to "user" when omitted
+    role: NotRequired[Literal["user", "admin", "super_admin"]]
 
-class UserResponse(BaseModel):
+class UserResponse(ResponseModel):
     id: int
     email: str
     role: str
@@ -25,47 +95,66 @@ class UserResponse(BaseModel):
     level: int = 1
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+class LoginUserResponse(ResponseModel):
+    email: str
+    role: str
+    is_admin: bool
+
+class LoginResponse(ResponseModel):
+    message: str
+    access_token: str
+    token_type: str = "bearer"
+    user: LoginUserResponse
 
 # Admin Schemas
 class CreateFirstAdminRequest(BaseModel):
-    email: EmailStr
-    password: str = Field(..., min_length=12)
+    email: Email
+    password: AdminPassword
     admin_creation_secret: str
 
 class AdminInviteRequest(BaseModel):
-    email: EmailStr
+    email: Email
     admin_creation_secret: str
 
-class AdminInviteAccept(BaseModel):
+class AdminInviteAccept(TypedDict):
     invite_token: str
-    password: str = Field(..., min_length=12)
+    password: AdminPassword
 
-class AdminInviteResponse(BaseModel):
+class AdminInviteResponse(ResponseModel):
     email: str
     invite_token: str
     expires_at: datetime
 
+class AdminInviteSummaryResponse(ResponseModel):
+    id: int
+    email: str
+    is_used: bool
+    expires_at: datetime
+    created_at: datetime
+    used_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
 # Habit Schemas
 class HabitCreate(BaseModel):
-    name: str = Field(..., min_length=1, max_length=255)
+    name: HabitName
     description: Optional[str] = None
     category: Optional[str] = None
-    difficulty_level: int = Field(default=1, ge=1, le=5)
-    target_frequency: str = Field(default="daily")
+    difficulty_level: Rating = 1
+    target_frequency: Literal["daily", "weekly", "monthly"] = "daily"
 
-class HabitCheckInResponse(BaseModel):
+class HabitCheckInResponse(ResponseModel):
     id: int
     check_in_date: datetime
     points_earned: int = 0
     mood_rating: Optional[int] = None
     notes: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
-class HabitResponse(BaseModel):
+class HabitResponse(ResponseModel):
     id: int
     name: str
     description: Optional[str]
@@ -76,11 +165,10 @@ class HabitResponse(BaseModel):
     points_per_completion: int
     check_ins: List[HabitCheckInResponse] = []
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # Progress Schemas
-class ProgressResponse(BaseModel):
+class ProgressResponse(ResponseModel):
     completedToday: int
     totalHabits: int
     completionRate: float = 0.0
@@ -88,18 +176,17 @@ class ProgressResponse(BaseModel):
     totalPoints: int = 0
 
 # Badge Schemas
-class BadgeResponse(BaseModel):
+class BadgeResponse(ResponseModel):
     id: int
     badge_type: str
     badge_name: str
     badge_description: str
     earned_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 # AI Recommendation Schemas
-class AIRecommendationResponse(BaseModel):
+class AIRecommendationResponse(ResponseModel):
     id: int
     recommendation_type: str
     title: str
@@ -109,14 +196,13 @@ class AIRecommendationResponse(BaseModel):
     source_ai: Optional[str]
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RecommendationRequest(BaseModel):
-    recommendation_type: str = Field(..., pattern="^(habit_suggestion|motivation|improvement)$")
+    recommendation_type: Literal["habit_suggestion", "motivation", "improvement"]
 
 # Stats Schemas
-class UserStatsResponse(BaseModel):
+class UserStatsResponse(ResponseModel):
     total_points: int
     level: int
     total_habits: int
@@ -126,25 +212,28 @@ class UserStatsResponse(BaseModel):
 
 # Check-in Request Schema
 class CheckInRequest(BaseModel):
-    mood_rating: Optional[int] = Field(None, ge=1, le=5)
+    mood_rating: Optional[Rating] = None
     notes: Optional[str] = None
 
 # Generic Response Schema
-class MessageResponse(BaseModel):
+class MessageResponse(ResponseModel):
     message: str
 
+class HealthResponse(ResponseModel):
+    status: str
+
 # Weekly Progress Schema
-class DailyProgressResponse(BaseModel):
+class DailyProgressResponse(ResponseModel):
     date: str
     completed: int
     total: int
     completion_rate: float
 
-class WeeklyProgressResponse(BaseModel):
+class WeeklyProgressResponse(ResponseModel):
     weekly_progress: List[DailyProgressResponse]
 
 # Admin Analytics Schema
-class AdminAnalyticsResponse(BaseModel):
+class AdminAnalyticsResponse(ResponseModel):
     total_users: int
     total_habits: int
     total_checkins: int
@@ -0,0 +1,10 @@
+# tests - run with `python -m unittest discover tests` from the repo root
+import os
+import tempfile
+
+# The app reads its configuration at import, so point it at a throwaway
+# SQLite database before any test module imports main
+_db_dir = tempfile.mkdtemp(prefix="habit_tracker_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+os.environ.pop("REDIS_URL", None)
+os.environ.pop("GEMINI_API_KEY", None)
@@ -0,0 +1,15 @@
+import asyncio
+from fastapi.testclient import TestClient
+
+import database
+import main
+import model
+
+def create_client() -> TestClient:
+    """TestClient over a freshly created schema"""
+    async def reset_schema():
+        async with database.engine.begin() as conn:
+            await conn.run_sync(model.Base.metadata.drop_all)
+            await conn.run_sync(model.Base.metadata.create_all)
+    asyncio.run(reset_schema())
+    return TestClient(main.app)
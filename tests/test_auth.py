@@ -0,0 +1,25 @@
+import unittest
+
+from schema import MAX_PASSWORD_LENGTH
+from tests.helpers import create_client
+
+class PasswordLengthTest(unittest.TestCase):
+    def setUp(self):
+        self.client = create_client()
+
+    def test_long_password_can_log_in_after_signup(self):
+        credentials = {"email": "long@example.com", "password": "p" * MAX_PASSWORD_LENGTH}
+        with self.client as client:
+            self.assertEqual(client.post("/api/signup", json=credentials).status_code, 200)
+            response = client.post("/api/login", json=credentials)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("access_token", response.json())
+
+    def test_signup_rejects_password_login_would_refuse(self):
+        credentials = {"email": "toolong@example.com", "password": "p" * (MAX_PASSWORD_LENGTH + 1)}
+        with self.client as client:
+            response = client.post("/api/signup", json=credentials)
+        self.assertEqual(response.status_code, 422)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+from schema import HabitCheckInResponse
+
+class FromOrmFastTest(unittest.TestCase):
+    def test_builds_in_declaration_order_with_overrides_and_defaults(self):
+        row = SimpleNamespace(id=1, check_in_date=datetime(2024, 1, 2), mood_rating=3, notes="ok")
+        check_in = HabitCheckInResponse.from_orm_fast(row, notes="override")
+        self.assertEqual(list(check_in.model_dump()), list(HabitCheckInResponse.model_fields))
+        self.assertEqual(check_in.notes, "override")
+        self.assertEqual(check_in.points_earned, 0)
+
+    def test_missing_required_field_raises(self):
+        row = SimpleNamespace(id=1, mood_rating=None, notes=None)
+        with self.assertRaisesRegex(ValueError, "HabitCheckInResponse.*'check_in_date'"):
+            HabitCheckInResponse.from_orm_fast(row)
+
+if __name__ == "__main__":
+    unittest.main()